@@ -40,10 +40,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'website',
     'cv',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Serves STATIC_ROOT (see the static files section below) before any
+    # other middleware runs.
+    'DjangoApp.storage.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,6 +75,13 @@ TEMPLATES = [
     },
 ]
 
+# URL namespaces whose templates get the website header/footer context from
+# website.context_processors.data_processor.
+SITE_CHROME_NAMESPACES = ['website']
+
+# Posts shown in the homepage news section; None shows every post.
+HOME_POSTS = None
+
 WSGI_APPLICATION = 'DjangoApp.wsgi.application'
 
 
@@ -85,6 +96,21 @@ DATABASES = {
 }
 
 
+# Cache
+# A file-based cache is shared by every worker process on the host, which the
+# website content version counters rely on.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -121,11 +147,38 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# collectstatic writes content-hashed copies of every asset plus gzip and
+# brotli variants of them. WhiteNoise serves the precompressed variant the
+# client accepts, and gives hashed names a one-year immutable Cache-Control.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'DjangoApp.storage.StaticFilesStorage',
+    },
+}
+# Fall back to the unhashed name instead of raising for an asset missing
+# from the manifest (e.g. before collectstatic has been run).
+WHITENOISE_MANIFEST_STRICT = False
+
+# Serve the bundles written by `manage.py build_assets` (and inline their
+# critical CSS) instead of the individual asset files. Pages fall back to
+# the individual files until the bundles have been built.
+ASSET_BUNDLES = not DEBUG
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploaded files are served by DjangoApp.media.serve_media. Behind nginx set
+# MEDIA_OFFLOAD = 'x-accel-redirect' (with an `internal` location mapping
+# MEDIA_ACCEL_REDIRECT_PREFIX to MEDIA_ROOT), or 'x-sendfile' behind Apache,
+# so the proxy streams the file instead of a worker.
+MEDIA_OFFLOAD = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 60 * 60 * 24
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -143,3 +196,12 @@ EMAIL_HOST_USER = 'ismailabbas355@gmail.com'
 EMAIL_HOST_PASSWORD = 'imfq lavp cgck tfqe'
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+
+# Background jobs (see jobs.queue); run the worker with `manage.py run_jobs`.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+
+# A unit change refreshes up to this many of its CVs in the request, and
+# queues jobs for more (see cv.refresh.request_refresh_many).
+CV_INLINE_REFRESH_LIMIT = 200
@@ -0,0 +1,26 @@
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    The vendored theme CSS references files that were never shipped with it
+    (source maps, jQuery UI images). Leave those references as they are
+    instead of failing collectstatic.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            return name
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, with hashed names cached for a year (the most HTTP caches
+    honour) rather than its default ten.
+    """
+    FOREVER = 365 * 24 * 60 * 60
@@ -1,83 +1,164 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.utils import unquote
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Func, OuterRef, Subquery
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
+
+from website.changelist import ChangelistBudgetMixin, DecadeFieldListFilter
+
 from .models import (
     Unit, CVSubmission, LanguageSkill, ComputerSkill, Education,
     ProfessionalMembership, ResearchArea, Training, Grant,
-    ProfessionalProject, Award, Patent, OtherInstitution
+    ProfessionalProject, Award, Patent, OtherInstitution, StatusChange, path_range
 )
-
-# Inline Models
-class LanguageSkillInline(admin.TabularInline):
-    model = LanguageSkill
-    extra = 1
-
-class ComputerSkillInline(admin.TabularInline):
-    model = ComputerSkill
-    extra = 1
-
-class EducationInline(admin.TabularInline):
-    model = Education
-    extra = 1
-
-class MembershipInline(admin.TabularInline):
-    model = ProfessionalMembership
-    extra = 1
-
-class ResearchAreaInline(admin.TabularInline):
-    model = ResearchArea
-    extra = 1
-
-class TrainingInline(admin.TabularInline):
-    model = Training
-    extra = 1
-
-class ProjectInline(admin.TabularInline):
-    model = ProfessionalProject
-    extra = 1
-
-class AwardInline(admin.TabularInline):
-    model = Award
-    extra = 1
-
-class PatentInline(admin.TabularInline):
-    model = Patent
-    extra = 1
-
-class GrantInline(admin.TabularInline):
-    model = Grant
-    extra = 1
-
-class OtherInstitutionInline(admin.TabularInline):
-    model = OtherInstitution
-    extra = 1
+from .export import export_response, xlsx_available
+from .formsets import CV_SECTIONS, SECTIONS_BY_NAME, section_formset
+from .refresh import batch_refresh
+from .search import matching_cvs, search_available
+from .views import save_formsets
+from .workflow import change_status
+
+
+# Rows of a CV section shown per page on the CV's change page.
+SECTION_PAGE_SIZE = 20
+
+
+def section_counts(cv_id):
+    """{section name: rows} of a CV, in one query."""
+    counts = {
+        section.name: Subquery(
+            section.model.objects.filter(cv=OuterRef('pk'))
+            .order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')
+        )
+        for section in CV_SECTIONS
+    }
+    try:
+        return CVSubmission.objects.filter(pk=cv_id).values(**counts).first() or {}
+    except ValueError:
+        # Not a pk; the change view itself reports the missing CV.
+        return {}
+
+
+class CVSectionSearchMixin:
+    """
+    Search a CV section by its own columns, or by the full-text index of the
+    CV it belongs to (instead of a LIKE scan joined on ``cv__name``).
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matches = matching_cvs(search_term)
+        if matches is not None:
+            results |= queryset.filter(cv__in=matches)
+        return results, may_have_duplicates
+
+
+class BatchRefreshMixin:
+    """
+    Run each admin write under one batch_refresh(), so a CV is refreshed once
+    per request rather than once per row the write (or its cascade) touches.
+    """
+
+    def changeform_view(self, *args, **kwargs):
+        with batch_refresh():
+            return super().changeform_view(*args, **kwargs)
+
+    def delete_view(self, *args, **kwargs):
+        with batch_refresh():
+            return super().delete_view(*args, **kwargs)
+
+    def delete_model(self, request, obj):
+        with batch_refresh():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with batch_refresh():
+            super().delete_queryset(request, queryset)
+
+
+class CVSectionAdmin(BatchRefreshMixin, CVSectionSearchMixin, ChangelistBudgetMixin, admin.ModelAdmin):
+    """A CV section's changelist: its own displayed columns plus the CV's label."""
+    list_select_related = ['cv__unit']
+
+    @property
+    def list_only(self):
+        # CVSubmission.__str__ shows the CV's name and unit.
+        return [name for name in self.list_display if name != 'cv'] + ['cv__name', 'cv__unit__name']
+
+
+class CVSubmissionAdminForm(forms.ModelForm):
+    """Offers only the statuses the CV may move to, as the bulk actions do."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'status' in self.fields:
+            current = self.instance.status
+            self.fields['status'].choices = [
+                (value, label) for value, label in CVSubmission.STATUS_CHOICES
+                if value == current or current in CVSubmission.STATUS_TRANSITIONS.get(value, ())
+            ]
+
+
+class UnitSubtreeFilter(admin.SimpleListFilter):
+    """Filter CVs by a unit and everything under it, with one range scan on Unit.path."""
+    title = 'unit'
+    parameter_name = 'unit_tree'
+
+    def lookups(self, request, model_admin):
+        return [
+            (unit.pk, '\u2003' * unit.depth + unit.name)
+            for unit in Unit.objects.order_by('path').only('pk', 'name', 'depth')
+        ]
+
+    def queryset(self, request, queryset):
+        # A value that is not a pk is ignored, as for a unit that is gone.
+        value = self.value()
+        unit = Unit.objects.filter(pk=value).only('path').first() if value and value.isdigit() else None
+        if unit is None:
+            return queryset
+        return queryset.filter(path_range(unit.path, 'unit__path'))
 
 
 @admin.register(Unit)
-class UnitAdmin(admin.ModelAdmin):
-    list_display = ['name', 'unit_type', 'parent']
+class UnitAdmin(ChangelistBudgetMixin, admin.ModelAdmin):
+    list_display = ['tree_name', 'unit_type', 'parent', 'subtree_cv_count']
     list_filter = ['unit_type']
+    list_select_related = ['parent']
+    list_only = ['name', 'unit_type', 'path', 'depth', 'parent__name']
     search_fields = ['name']
+    ordering = ['path']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_subtree_cv_counts()
+
+    @admin.display(description='Name', ordering='path')
+    def tree_name(self, obj):
+        return '\u2003' * obj.depth + obj.name
+
+    @admin.display(description='CVs (incl. sub-units)', ordering='subtree_cv_count')
+    def subtree_cv_count(self, obj):
+        return obj.subtree_cv_count
 
 
 @admin.register(CVSubmission)
-class CVSubmissionAdmin(admin.ModelAdmin):
+class CVSubmissionAdmin(BatchRefreshMixin, ChangelistBudgetMixin, admin.ModelAdmin):
+    form = CVSubmissionAdminForm
     list_display = ['name', 'email', 'tel_no', 'unit', 'age_bracket', 'status', 'submitted_at']
-    list_filter = ['status', 'age_bracket', 'unit']
+    list_select_related = ['unit']
+    list_only = ['name', 'email', 'tel_no', 'unit__name', 'age_bracket', 'status', 'submitted_at']
+    list_filter = ['status', 'age_bracket', UnitSubtreeFilter]
     search_fields = ['name', 'email', 'tel_no']
+    search_help_text = 'Searches names, contacts, units and the full text of every CV section.'
     date_hierarchy = 'submitted_at'
     ordering = ['-submitted_at']
-    
-    inlines = [
-        LanguageSkillInline,
-        ComputerSkillInline,
-        EducationInline,
-        MembershipInline,
-        ResearchAreaInline,
-        TrainingInline,
-        ProjectInline,
-        AwardInline,
-        PatentInline,
-        GrantInline,
-        OtherInstitutionInline,
+    actions = [
+        'mark_reviewed', 'mark_approved', 'mark_approved_and_notify', 'return_to_submitted',
+        'export_csv', 'export_jsonl', 'export_xlsx',
     ]
     
     fieldsets = (
@@ -92,76 +173,213 @@ class CVSubmissionAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_fields(self, request):
+        # With the cv_search index, names and sections are matched there and
+        # only the contacts are scanned, for substrings like a phone number's
+        # middle digits or part of an email domain.
+        return ['email', 'tel_no'] if search_available() else self.search_fields
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matches = matching_cvs(search_term)
+        if matches is not None:
+            results |= queryset.filter(pk__in=matches)
+        return results, may_have_duplicates
+
+    def get_urls(self):
+        return [
+            path(
+                '<path:object_id>/section/<str:name>/',
+                self.admin_site.admin_view(self.section_view),
+                name='cv_cvsubmission_section',
+            ),
+        ] + super().get_urls()
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        # The sections are listed with their sizes and loaded one at a time
+        # by section_view, rather than rendered here as eleven inlines.
+        counts = section_counts(unquote(object_id))
+        sections = [
+            (section, counts.get(section.name, 0), reverse(
+                f'{self.admin_site.name}:cv_cvsubmission_section', args=[object_id, section.name],
+            ))
+            for section in CV_SECTIONS
+        ]
+        extra_context = {**(extra_context or {}), 'cv_sections': sections}
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    def section_view(self, request, object_id, name):
+        """
+        One page of one section of a CV as an editable formset fragment. A
+        POST saves just the rows of that page.
+        """
+        section = SECTIONS_BY_NAME.get(name)
+        cv = self.get_object(request, unquote(object_id))
+        if section is None or cv is None:
+            raise Http404
+        if not self.has_view_or_change_permission(request, cv):
+            raise PermissionDenied
+        can_change = self.has_change_permission(request, cv)
+
+        rows = section.model.objects.filter(cv=cv).order_by('pk').values_list('pk', flat=True)
+        page = Paginator(rows, SECTION_PAGE_SIZE).get_page(request.GET.get('page'))
+        queryset = section.model.objects.filter(pk__in=list(page)).order_by('pk')
+
+        saved = False
+        if request.method == 'POST':
+            if not can_change:
+                raise PermissionDenied
+            formset = section_formset(section, request.POST, instance=cv, queryset=queryset)
+            if formset.is_valid():
+                with transaction.atomic(), batch_refresh():
+                    save_formsets({name: formset}, cv)
+                self.log_change(request, cv, f'Changed {section.display_name}.')
+                return redirect(f'{request.path}?page={page.number}&saved=1')
+        else:
+            formset = section_formset(section, instance=cv, queryset=queryset)
+            saved = 'saved' in request.GET
+
+        return render(request, 'admin/cv/cvsubmission/section.html', {
+            'section': section,
+            'formset': formset,
+            'page': page,
+            'can_change': can_change,
+            'saved': saved,
+        })
+
+    def move_to(self, request, queryset, status, notify=False):
+        moved = change_status(queryset, status, user=request.user, notify=notify)
+        label = dict(CVSubmission.STATUS_CHOICES)[status].lower()
+        if moved:
+            self.message_user(request, f'Marked {moved} CV(s) as {label}.', messages.SUCCESS)
+        else:
+            sources = ', '.join(CVSubmission.STATUS_TRANSITIONS[status])
+            self.message_user(request, f'No CVs marked as {label}: only {sources} CVs can be.', messages.WARNING)
+
+    @admin.action(description='Mark selected CVs as reviewed', permissions=['change'])
+    def mark_reviewed(self, request, queryset):
+        self.move_to(request, queryset, 'reviewed')
+
+    @admin.action(description='Approve selected CVs', permissions=['change'])
+    def mark_approved(self, request, queryset):
+        self.move_to(request, queryset, 'approved')
+
+    @admin.action(description='Approve selected CVs and email their owners', permissions=['change'])
+    def mark_approved_and_notify(self, request, queryset):
+        self.move_to(request, queryset, 'approved', notify=True)
+
+    @admin.action(description='Return selected CVs to submitted', permissions=['change'])
+    def return_to_submitted(self, request, queryset):
+        self.move_to(request, queryset, 'submitted')
+
+    @admin.action(description='Export selected CVs as CSV')
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    @admin.action(description='Export selected CVs as JSON lines')
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+
+    @admin.action(description='Export selected CVs as an Excel workbook')
+    def export_xlsx(self, request, queryset):
+        if not xlsx_available():
+            self.message_user(request, 'Excel export needs openpyxl installed.', messages.ERROR)
+            return None
+        return export_response(queryset, 'xlsx')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'status' in form.changed_data:
+            StatusChange.objects.create(
+                cv=obj, from_status=form.initial['status'], to_status=obj.status, changed_by=request.user,
+            )
+
+
+@admin.register(StatusChange)
+class StatusChangeAdmin(ChangelistBudgetMixin, admin.ModelAdmin):
+    list_display = ['cv', 'from_status', 'to_status', 'changed_by', 'changed_at']
+    list_filter = ['to_status']
+    list_select_related = ['cv__unit', 'changed_by']
+    list_only = ['from_status', 'to_status', 'changed_at', 'cv__name', 'cv__unit__name', 'changed_by__username']
+    date_hierarchy = 'changed_at'
+
+    # An audit log: written by the status workflow only.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(LanguageSkill)
-class LanguageSkillAdmin(admin.ModelAdmin):
+class LanguageSkillAdmin(CVSectionAdmin):
     list_display = ['cv', 'language', 'proficiency']
-    search_fields = ['language', 'cv__name']
+    search_fields = ['language']
     list_filter = ['proficiency']
 
 
 @admin.register(ComputerSkill)
-class ComputerSkillAdmin(admin.ModelAdmin):
+class ComputerSkillAdmin(CVSectionAdmin):
     list_display = ['cv', 'skill', 'proficiency']
-    search_fields = ['skill', 'cv__name']
+    search_fields = ['skill']
     list_filter = ['proficiency']
 
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(CVSectionAdmin):
     list_display = ['cv', 'degree', 'institution', 'year']
-    search_fields = ['degree', 'institution', 'cv__name']
-    list_filter = ['year']
+    search_fields = ['degree', 'institution']
+    list_filter = [('year', DecadeFieldListFilter)]
 
 
 @admin.register(ProfessionalMembership)
-class ProfessionalMembershipAdmin(admin.ModelAdmin):
+class ProfessionalMembershipAdmin(CVSectionAdmin):
     list_display = ['cv', 'organization', 'membership_type', 'year_joined']
-    list_filter = ['membership_type', 'year_joined']
-    search_fields = ['organization', 'cv__name']
+    list_filter = ['membership_type', ('year_joined', DecadeFieldListFilter)]
+    search_fields = ['organization']
 
 
 @admin.register(ResearchArea)
-class ResearchAreaAdmin(admin.ModelAdmin):
+class ResearchAreaAdmin(CVSectionAdmin):
     list_display = ['cv', 'area']
-    search_fields = ['area', 'cv__name']
+    search_fields = ['area']
 
 
 @admin.register(Training)
-class TrainingAdmin(admin.ModelAdmin):
+class TrainingAdmin(CVSectionAdmin):
     list_display = ['cv', 'title', 'institution', 'year']
-    search_fields = ['title', 'institution', 'cv__name']
-    list_filter = ['year']
+    search_fields = ['title', 'institution']
+    list_filter = [('year', DecadeFieldListFilter)]
 
 
 @admin.register(ProfessionalProject)
-class ProfessionalProjectAdmin(admin.ModelAdmin):
+class ProfessionalProjectAdmin(CVSectionAdmin):
     list_display = ['cv', 'title', 'start_year', 'end_year']
-    search_fields = ['title', 'cv__name']
-    list_filter = ['start_year', 'end_year']
+    search_fields = ['title']
+    list_filter = [('start_year', DecadeFieldListFilter), ('end_year', DecadeFieldListFilter)]
 
 
 @admin.register(Award)
-class AwardAdmin(admin.ModelAdmin):
+class AwardAdmin(CVSectionAdmin):
     list_display = ['cv', 'name', 'organization', 'year']
-    search_fields = ['name', 'organization', 'cv__name']
-    list_filter = ['year']
+    search_fields = ['name', 'organization']
+    list_filter = [('year', DecadeFieldListFilter)]
 
 
 @admin.register(Patent)
-class PatentAdmin(admin.ModelAdmin):
+class PatentAdmin(CVSectionAdmin):
     list_display = ['cv', 'title', 'patent_number', 'year']
-    search_fields = ['title', 'patent_number', 'cv__name']
-    list_filter = ['year']
+    search_fields = ['title', 'patent_number']
+    list_filter = [('year', DecadeFieldListFilter)]
 
 @admin.register(Grant)
-class GrantAdmin(admin.ModelAdmin):
+class GrantAdmin(CVSectionAdmin):
     list_display = ['cv', 'title', 'amount', 'year']
-    search_fields = ['title', 'amount', 'cv__name']
-    list_filter = ['year']
+    search_fields = ['title', 'amount']
+    list_filter = [('year', DecadeFieldListFilter)]
 
 
 @admin.register(OtherInstitution)
-class OtherInstitutionAdmin(admin.ModelAdmin):
+class OtherInstitutionAdmin(CVSectionAdmin):
     list_display = ['cv', 'name', 'purpose']
-    search_fields = ['name', 'purpose', 'cv__name']
+    search_fields = ['name', 'purpose']
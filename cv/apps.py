@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CvConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cv'
+
+    def ready(self):
+        from cv.signals import connect_signals
+        connect_signals()
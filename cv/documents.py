@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+
+from .export import cv_record, iter_cvs
+from .formsets import CV_SECTIONS
+from .models import CVDocument, CVSubmission
+
+
+REFRESH_CHUNK_SIZE = 500
+
+
+def _display(obj, field):
+    value = getattr(obj, f'get_{field.name}_display')() if field.choices else getattr(obj, field.attname)
+    return '' if value is None else value
+
+
+def section_tables(rows):
+    """(section, headers, [[cell]]) of the sections with rows, in form order."""
+    tables = []
+    for section in CV_SECTIONS:
+        objs = rows[section.name]
+        if not objs:
+            continue
+        fields = [section.model._meta.get_field(name) for name in section.form._meta.fields]
+        tables.append((
+            section,
+            [field.verbose_name.capitalize() for field in fields],
+            [[_display(obj, field) for field in fields] for obj in objs],
+        ))
+    return tables
+
+
+def render_cv(cv, rows):
+    return render_to_string('cv/partials/cv_document.html', {'cv': cv, 'sections': section_tables(rows)})
+
+
+def refresh_documents(cv_ids):
+    """
+    Rebuild the CVDocument of each given CV from the database, each chunk in
+    one transaction; documents of CVs that no longer exist are removed.
+    """
+    cv_ids = list(cv_ids)
+    for start in range(0, len(cv_ids), REFRESH_CHUNK_SIZE):
+        chunk = cv_ids[start:start + REFRESH_CHUNK_SIZE]
+        documents = [
+            CVDocument(cv=cv, version=cv.version, data=cv_record(cv, rows), html=render_cv(cv, rows))
+            for cv, rows in iter_cvs(CVSubmission.objects.filter(pk__in=chunk))
+        ]
+        with transaction.atomic():
+            CVDocument.objects.filter(cv_id__in=chunk).exclude(cv_id__in=[doc.cv_id for doc in documents]).delete()
+            CVDocument.objects.bulk_create(
+                documents, update_conflicts=True, unique_fields=['cv'],
+                update_fields=['version', 'data', 'html', 'built_at'],
+            )
+
+
+def rebuild_documents():
+    """Rebuild every CV's document. Returns the number of CVs."""
+    cv_ids = list(CVSubmission.objects.order_by('pk').values_list('pk', flat=True))
+    refresh_documents(cv_ids)
+    return len(cv_ids)
+
+
+def get_document(cv_id):
+    """
+    The CVDocument of a CV, read in one query that also reads the CV's
+    current version; rebuilt first if missing or stale. None if there is
+    no such CV.
+    """
+    document = CVDocument.objects.filter(cv_id=cv_id).annotate(current_version=F('cv__version')).first()
+    if document is None or document.version != document.current_version:
+        refresh_documents([cv_id])
+        document = CVDocument.objects.filter(cv_id=cv_id).first()
+    return document
@@ -0,0 +1,153 @@
+import csv
+import json
+import tempfile
+from importlib.util import find_spec
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .formsets import CV_SECTIONS
+from .importer import format_section
+
+
+# CVs read per query; each chunk also costs one prefetch query per section.
+EXPORT_CHUNK_SIZE = 500
+
+CV_COLUMNS = ('id', 'name', 'email', 'tel_no', 'unit', 'age_bracket', 'status', 'submitted_at', 'updated_at')
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def xlsx_available():
+    # In requirements.txt; checked so an install without it reports the
+    # missing package instead of failing mid-export.
+    return find_spec('openpyxl') is not None
+
+
+def iter_cvs(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield (cv, {section name: rows}) for the CVs of ``queryset``, reading them
+    in pk order one chunk at a time (keyed on the last pk rather than an
+    OFFSET), so memory is bounded by the chunk whatever the total. A chunk's
+    sections take one query each and are grouped here: cheaper than
+    prefetch_related's related manager per CV and section.
+    """
+    queryset = queryset.defer(None).order_by('pk').select_related('unit')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        pks = [cv.pk for cv in chunk]
+        rows = {pk: {section.name: [] for section in CV_SECTIONS} for pk in pks}
+        if pks:
+            for section in CV_SECTIONS:
+                for obj in section.model.objects.filter(cv_id__in=pks):
+                    rows[obj.cv_id][section.name].append(obj)
+        for cv in chunk:
+            yield cv, rows[cv.pk]
+        if len(chunk) < chunk_size:
+            return
+        last_pk = pks[-1]
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields if not (field.primary_key or field.is_relation)]
+
+
+SECTION_FIELDS = {section.name: _fields(section.model) for section in CV_SECTIONS}
+
+
+def cv_values(cv):
+    return [
+        cv.pk, cv.name, cv.email, cv.tel_no, cv.unit.name if cv.unit else '',
+        cv.age_bracket, cv.status, cv.submitted_at, cv.updated_at,
+    ]
+
+
+def cv_record(cv, rows):
+    """A CV as one nested dict, every section a list of its rows."""
+    record = dict(zip(CV_COLUMNS, cv_values(cv)))
+    for name, fields in SECTION_FIELDS.items():
+        record[name] = [{field: getattr(obj, field) for field in fields} for obj in rows[name]]
+    return record
+
+
+def flat_header():
+    return list(CV_COLUMNS) + [section.name for section in CV_SECTIONS]
+
+
+def flat_row(cv, rows):
+    """A CV as one spreadsheet row, each section a cell in the importer's format."""
+    return cv_values(cv) + [format_section(section.name, rows[section.name]) for section in CV_SECTIONS]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(flat_header())
+    for cv, rows in iter_cvs(queryset):
+        yield writer.writerow(flat_row(cv, rows))
+
+
+def jsonl_lines(queryset):
+    for cv, rows in iter_cvs(queryset):
+        yield json.dumps(cv_record(cv, rows), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(queryset, format):
+    return csv_lines(queryset) if format == 'csv' else jsonl_lines(queryset)
+
+
+def write_xlsx(queryset, file):
+    """Write the flattened rows to ``file`` as a workbook. Needs openpyxl."""
+    from openpyxl import Workbook
+
+    # Write-only mode streams rows to disk instead of building every cell.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('CVs')
+    sheet.append(flat_header())
+    for cv, rows in iter_cvs(queryset):
+        row = flat_row(cv, rows)
+        # Excel has no time zones.
+        row[7:9] = [timezone.make_naive(value) if timezone.is_aware(value) else value for value in row[7:9]]
+        sheet.append(row)
+    workbook.save(file)
+
+
+def write_export(queryset, format, file):
+    """Write an export to an open file: binary for xlsx, text otherwise."""
+    if format == 'xlsx':
+        write_xlsx(queryset, file)
+    else:
+        for line in export_lines(queryset, format):
+            file.write(line)
+
+
+def export_filename(format):
+    return f'cvs-{timezone.localdate():%Y-%m-%d}.{format}'
+
+
+def export_response(queryset, format):
+    """
+    The export as a download. CSV and JSONL are streamed as they are read; a
+    workbook can only be sent once complete, so it is spooled to a temporary
+    file first.
+    """
+    content_type = EXPORT_FORMATS[format]
+    if format == 'xlsx':
+        file = tempfile.TemporaryFile()
+        write_xlsx(queryset, file)
+        file.seek(0)
+        return FileResponse(file, as_attachment=True, filename=export_filename(format), content_type=content_type)
+
+    response = StreamingHttpResponse(export_lines(queryset, format), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(format)}"'
+    return response
@@ -0,0 +1,206 @@
+from collections import Counter, namedtuple
+
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef
+
+from .models import CVFacet, CVSubmission, FacetCount, LanguageSkill, ProfessionalMembership, Unit
+
+
+REFRESH_CHUNK_SIZE = 500
+
+# Facet values offered per facet on the expert finder, most common first.
+MAX_OPTIONS = 20
+
+
+def _clean(text):
+    return ' '.join(text.split())
+
+
+def _degree(text):
+    # 'Ph.D', 'PhD' and 'phd' are the same degree.
+    return _clean(text).replace('.', '').upper()
+
+
+def _units(cv):
+    # The CV's unit and every unit above it, read off the unit's path: picking
+    # a faculty finds the CVs of its departments with the same single
+    # (facet, value) lookup.
+    if cv.unit is None:
+        return []
+    return [str(int(segment)) for segment in cv.unit.path.split('/') if segment] or [str(cv.unit_id)]
+
+
+# name: the query parameter; values(cv): the facet's values for a CV with its
+# unit selected and FACET_PREFETCH prefetched.
+Facet = namedtuple('Facet', 'name label values')
+
+FACETS = (
+    Facet('unit', 'Unit', _units),
+    Facet('age', 'Age bracket', lambda cv: [cv.age_bracket]),
+    Facet('language', 'Language', lambda cv: [f'{_clean(skill.language).title()}:{skill.proficiency}' for skill in cv.languages.all()]),
+    Facet('degree', 'Degree', lambda cv: [_degree(education.degree) for education in cv.educations.all()]),
+    Facet('membership', 'Membership', lambda cv: [membership.membership_type for membership in cv.memberships.all()]),
+    Facet('research', 'Research area', lambda cv: [_clean(area.area).title() for area in cv.research_areas.all()]),
+)
+
+FACET_NAMES = tuple(facet.name for facet in FACETS)
+
+FACET_PREFETCH = ('languages', 'educations', 'memberships', 'research_areas')
+
+
+def cv_facet_values(cv):
+    return {(facet.name, value[:200]) for facet in FACETS for value in facet.values(cv) if value}
+
+
+# Maintenance
+
+def adjust_counts(deltas):
+    """Add each {(facet, value): delta} to its FacetCount row, creating it if needed."""
+    rows = [(facet, value, delta) for (facet, value), delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = connection.ops.quote_name(FacetCount._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (facet, value, "count") VALUES (%s, %s, %s) '
+            f'ON CONFLICT (facet, value) DO UPDATE SET "count" = {table}."count" + excluded."count"',
+            rows,
+        )
+
+
+def refresh_cv_facets(cv_ids):
+    """
+    Bring the CVFacet rows of the given CVs in line with their current data
+    and apply the difference to FacetCount, so the counts never need a
+    GROUP BY over the CV tables. CVs that no longer exist lose their rows.
+    """
+    cv_ids = list(cv_ids)
+    for start in range(0, len(cv_ids), REFRESH_CHUNK_SIZE):
+        chunk = cv_ids[start:start + REFRESH_CHUNK_SIZE]
+        existing = {
+            (cv_id, facet, value): pk
+            for pk, cv_id, facet, value in CVFacet.objects.filter(cv_id__in=chunk).values_list('pk', 'cv_id', 'facet', 'value')
+        }
+        cvs = CVSubmission.objects.filter(pk__in=chunk).select_related('unit').prefetch_related(*FACET_PREFETCH)
+        current = {(cv.pk, facet, value) for cv in cvs for facet, value in cv_facet_values(cv)}
+
+        removed = existing.keys() - current
+        added = current - existing.keys()
+        if removed:
+            CVFacet.objects.filter(pk__in=[existing[key] for key in removed]).delete()
+        if added:
+            CVFacet.objects.bulk_create([CVFacet(cv_id=cv_id, facet=facet, value=value) for cv_id, facet, value in added])
+
+        deltas = Counter((facet, value) for _, facet, value in added)
+        deltas.subtract((facet, value) for _, facet, value in removed)
+        adjust_counts(deltas)
+
+
+def rebuild_facets():
+    """Recompute every CV's facets and all counts. Returns the number of CVs."""
+    CVFacet.objects.all().delete()
+    FacetCount.objects.all().delete()
+    cv_ids = list(CVSubmission.objects.order_by('pk').values_list('pk', flat=True))
+    refresh_cv_facets(cv_ids)
+    return len(cv_ids)
+
+
+# Querying
+
+def parse_selection(params):
+    """{facet: [values]} of the facets selected in a QueryDict."""
+    return {name: params.getlist(name) for name in FACET_NAMES if params.getlist(name)}
+
+
+def matching_cv_ids(selection):
+    """
+    A subquery of the CVs having at least one selected value of every
+    selected facet, or None when nothing is selected. It walks the index
+    range of the facet with the fewest CVs (per FacetCount) and probes the
+    others' (facet, value, cv) index for each of those CVs.
+    """
+    if not selection:
+        return None
+    sizes = Counter()
+    for facet, value, count in FacetCount.objects.filter(facet__in=selection).values_list('facet', 'value', 'count'):
+        if value in selection[facet]:
+            sizes[facet] += count
+
+    driver, *probes = sorted(selection, key=lambda name: sizes[name])
+    rows = CVFacet.objects.filter(facet=driver, value__in=selection[driver])
+    for facet in probes:
+        rows = rows.filter(Exists(
+            CVFacet.objects.filter(facet=facet, value__in=selection[facet], cv_id=OuterRef('cv_id'))
+        ))
+    return rows.values('cv_id')
+
+
+def filter_cvs(selection, queryset=None):
+    queryset = CVSubmission.objects.all() if queryset is None else queryset
+    ids = matching_cv_ids(selection)
+    return queryset if ids is None else queryset.filter(pk__in=ids)
+
+
+def _value_labels(facet, values):
+    if facet == 'unit':
+        names = Unit.objects.in_bulk([int(value) for value in values if value.isdigit()])
+        return {value: str(names[int(value)]) for value in values if value.isdigit() and int(value) in names}
+    if facet == 'age':
+        return dict(CVSubmission.AGE_BRACKETS)
+    if facet == 'membership':
+        return dict(ProfessionalMembership.MEMBERSHIP_TYPES)
+    if facet == 'language':
+        levels = dict(LanguageSkill.PROFICIENCY_LEVELS)
+        labels = {}
+        for value in values:
+            language, _, level = value.rpartition(':')
+            labels[value] = f'{language} ({levels.get(level, level)})'
+        return labels
+    return {}
+
+
+FacetOption = namedtuple('FacetOption', 'value label count selected')
+FacetGroup = namedtuple('FacetGroup', 'name label options')
+
+
+def _counts(selection):
+    """{facet: [(value, count)]} over the CVs matching ``selection``."""
+    if selection:
+        # No predicate on facet, so the (cv, facet, value) index drives it.
+        rows = (
+            CVFacet.objects.filter(cv_id__in=matching_cv_ids(selection))
+            .order_by().values('facet', 'value').annotate(count=Count('pk'))
+            .values_list('facet', 'value', 'count')
+        )
+    else:
+        rows = FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count')
+    counts = {}
+    for facet, value, count in rows:
+        counts.setdefault(facet, []).append((value, count))
+    return counts
+
+
+def facet_counts(selection):
+    """
+    The options of every facet with their counts, each facet counted under
+    the selections of the *other* facets so its own values stay choosable.
+    Facets without a selection share one query; without any other
+    selection the counts come straight from FacetCount.
+    """
+    by_others = {}
+    groups = []
+    for facet in FACETS:
+        others = {name: values for name, values in selection.items() if name != facet.name}
+        key = tuple(sorted(others))
+        if key not in by_others:
+            by_others[key] = _counts(others)
+        counts = sorted(by_others[key].get(facet.name, ()), key=lambda row: (-row[1], row[0]))
+
+        selected = set(selection.get(facet.name, ()))
+        shown = counts[:MAX_OPTIONS] + [row for row in counts[MAX_OPTIONS:] if row[0] in selected]
+        labels = _value_labels(facet.name, [value for value, _ in shown])
+        groups.append(FacetGroup(facet.name, facet.label, [
+            FacetOption(value, labels.get(value, value), count, value in selected)
+            for value, count in shown
+        ]))
+    return groups
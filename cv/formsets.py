@@ -0,0 +1,72 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.forms import inlineformset_factory
+from django.template.loader import render_to_string
+
+from .models import (
+    CVSubmission, LanguageSkill, ComputerSkill, Education,
+    ProfessionalMembership, ResearchArea, Training,
+    ProfessionalProject, Award, Patent, Grant, OtherInstitution
+)
+from .forms import (
+    LanguageSkillForm, ComputerSkillForm, EducationForm,
+    ProfessionalMembershipForm, ResearchAreaForm, TrainingForm,
+    ProfessionalProjectForm, AwardForm, PatentForm, GrantForm, OtherInstitutionForm
+)
+
+
+class CVSection(NamedTuple):
+    name: str
+    display_name: str
+    model: type
+    form: type
+    formset: type
+
+
+def section(name, display_name, model, form, extra=1, max_num=None):
+    formset = inlineformset_factory(CVSubmission, model, form=form, can_delete=True, extra=extra, max_num=max_num)
+    return CVSection(name, display_name, model, form, formset)
+
+
+# The child sections of the CV form, in display order. The formset classes
+# are built once, at import time.
+CV_SECTIONS = (
+    section('language', 'Language Competency', LanguageSkill, LanguageSkillForm),
+    section('education', 'Tertiary Education', Education, EducationForm),
+    section('training', 'Additional Qualifications/Trainings with Certificate', Training, TrainingForm),
+    section('computer', 'ICT Skills', ComputerSkill, ComputerSkillForm),
+    section('research', 'Core Research Areas', ResearchArea, ResearchAreaForm, max_num=10),
+    section('patent', 'Patents', Patent, PatentForm),
+    section('grant', 'grants', Grant, GrantForm),
+    section('award', 'Awards/Recognitions', Award, AwardForm),
+    section('membership', 'Professional Memberships', ProfessionalMembership, ProfessionalMembershipForm),
+    section('project', 'Professional Projects', ProfessionalProject, ProfessionalProjectForm),
+    section('institution', 'Other Institutions', OtherInstitution, OtherInstitutionForm),
+)
+
+SECTIONS_BY_NAME = {section.name: section for section in CV_SECTIONS}
+
+
+def build_formsets(data=None, instance=None):
+    return {
+        section.name: section.formset(data, prefix=section.name, instance=instance)
+        for section in CV_SECTIONS
+    }
+
+
+def section_formset(section, data=None, instance=None, queryset=None):
+    """
+    One section's formset over ``queryset`` (by default all of the CV's rows),
+    without blank rows: an editor adds those from the empty form.
+    """
+    formset = section.formset(data, prefix=section.name, instance=instance, queryset=queryset)
+    formset.extra = 0
+    return formset
+
+
+@lru_cache(maxsize=None)
+def empty_form_html(name):
+    """The hidden row template a section's "Add" button clones; it never changes."""
+    formset = SECTIONS_BY_NAME[name].formset(prefix=name)
+    return render_to_string('cv/partials/empty_form.html', {'name': name, 'formset': formset})
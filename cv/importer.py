@@ -0,0 +1,286 @@
+import csv
+import json
+from typing import NamedTuple
+
+from django import forms
+from django.db import transaction
+from django.utils import timezone
+
+from .formsets import CV_SECTIONS
+from .forms import CVSubmissionForm
+from .models import CVSubmission, Unit
+from .refresh import batch_refresh, request_refresh
+
+
+# Records validated and written per transaction.
+IMPORT_CHUNK_SIZE = 500
+
+# In a CSV cell, a section's rows are separated by ENTRY_SEPARATOR and the
+# fields of a row, in the order of the section form's fields, by
+# FIELD_SEPARATOR: "French | fluent; Hausa | basic". A separator (or ESCAPE)
+# inside a value is preceded by ESCAPE: "Dams\; levees".
+ENTRY_SEPARATOR = ';'
+FIELD_SEPARATOR = '|'
+ESCAPE = '\\'
+
+SECTION_FORM_FIELDS = {section.name: section.form._meta.fields for section in CV_SECTIONS}
+
+
+class ImportRecord(NamedTuple):
+    line: int
+    data: dict
+
+
+class ValidRecord(NamedTuple):
+    line: int
+    email: str
+    cv: CVSubmission
+    # {section name: unsaved rows} of the sections the record gives.
+    sections: dict
+
+
+class Reject(NamedTuple):
+    line: int
+    email: str
+    errors: str
+
+
+class ImportStats(NamedTuple):
+    created: int
+    updated: int
+    rejected: int
+
+
+def _split_cell(cell):
+    """The rows of a section cell, each a list of its field values."""
+    rows, values, value = [], [], []
+    i = 0
+    while i < len(cell):
+        char = cell[i]
+        if char == ESCAPE and cell[i + 1:i + 2] in (ESCAPE, FIELD_SEPARATOR, ENTRY_SEPARATOR):
+            i += 1
+            value.append(cell[i])
+        elif char in (FIELD_SEPARATOR, ENTRY_SEPARATOR):
+            values.append(''.join(value).strip())
+            value = []
+            if char == ENTRY_SEPARATOR:
+                rows.append(values)
+                values = []
+        else:
+            value.append(char)
+        i += 1
+    values.append(''.join(value).strip())
+    rows.append(values)
+    return [values for values in rows if values != ['']]
+
+
+def _csv_section(name, cell):
+    fields = SECTION_FORM_FIELDS[name]
+    return [dict(zip(fields, values)) for values in _split_cell(cell)]
+
+
+def _escape(value):
+    for char in (ESCAPE, FIELD_SEPARATOR, ENTRY_SEPARATOR):
+        value = value.replace(char, ESCAPE + char)
+    return value
+
+
+def format_section(name, rows):
+    """The CSV cell read_csv() reads back as the section ``name``'s ``rows``."""
+    fields = SECTION_FORM_FIELDS[name]
+    return f'{ENTRY_SEPARATOR} '.join(
+        f' {FIELD_SEPARATOR} '.join(_escape('' if getattr(row, field) is None else str(getattr(row, field))) for field in fields)
+        for row in rows
+    )
+
+
+def read_csv(file):
+    """
+    Records from a CSV with a header row: the CV's columns (name, email,
+    tel_no, unit, age_bracket) and a column per section to import.
+    """
+    reader = csv.DictReader(file)
+    for record in reader:
+        data = {key: value or '' for key, value in record.items() if key}
+        for name in SECTION_FORM_FIELDS:
+            if name in data:
+                data[name] = _csv_section(name, data[name])
+        # line_num is the physical line, quoted newlines included.
+        yield ImportRecord(reader.line_num, data)
+
+
+def read_jsonl(file):
+    """Records from JSON lines, one CV per line as written by export_cvs."""
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            data = {'_error': f'Invalid JSON: {e}'}
+        if not isinstance(data, dict):
+            data = {'_error': 'Each line must be a JSON object.'}
+        yield ImportRecord(line, data)
+
+
+def _errors(form, prefix=''):
+    return '; '.join(
+        f'{prefix}{field}: {" ".join(messages)}' if field != '__all__' else f'{prefix}{" ".join(messages)}'
+        for field, messages in form.errors.items()
+    )
+
+
+def validate_record(record, units):
+    """
+    A ValidRecord, or a Reject with every error of the record. The CV and
+    section rows are checked by the same ModelForms as the submission page;
+    the unit is given by name and looked up in ``units`` ({lowercased name:
+    pk}) rather than by the form, which would cost a query per record.
+    """
+    data = record.data
+    if '_error' in data:
+        return Reject(record.line, '', data['_error'])
+    errors = []
+
+    try:
+        email = forms.EmailField().clean(str(data.get('email') or '')).lower()
+    except forms.ValidationError as e:
+        email = str(data.get('email') or '')
+        errors.append(f'email: {" ".join(e.messages)}')
+
+    unit_name = str(data.get('unit') or '').strip()
+    unit_id = units.get(unit_name.lower()) if unit_name else None
+    if unit_name and unit_id is None:
+        errors.append(f'unit: No unit named "{unit_name}".')
+
+    form = CVSubmissionForm({key: data.get(key) for key in ('name', 'tel_no', 'age_bracket')})
+    del form.fields['unit']
+    if form.is_valid():
+        cv = form.save(commit=False)
+        cv.email, cv.unit_id = email, unit_id
+    else:
+        errors.append(_errors(form))
+
+    sections = {}
+    for section in CV_SECTIONS:
+        rows = data.get(section.name)
+        if rows is None:
+            continue
+        if not isinstance(rows, list):
+            errors.append(f'{section.name}: Expected a list of rows.')
+            continue
+        sections[section.name] = []
+        for i, row in enumerate(rows, 1):
+            row_form = section.form(row if isinstance(row, dict) else {})
+            if row_form.is_valid():
+                sections[section.name].append(row_form.save(commit=False))
+            else:
+                errors.append(_errors(row_form, f'{section.name} {i} '))
+        errors.extend(_duplicate_errors(section, sections[section.name]))
+
+    if errors:
+        return Reject(record.line, email, '; '.join(errors))
+    return ValidRecord(record.line, email, cv, sections)
+
+
+def _duplicate_errors(section, rows):
+    """Rows of one CV the section's unique_together would refuse."""
+    errors = []
+    for fields in section.model._meta.unique_together:
+        fields = [field for field in fields if field != 'cv']
+        seen = set()
+        for row in rows:
+            key = tuple(getattr(row, field) for field in fields)
+            if key in seen:
+                errors.append(f'{section.name}: {", ".join(map(str, key))} is listed twice.')
+            seen.add(key)
+    return errors
+
+
+def write_chunk(records):
+    """
+    Create or update the CVs of ``records`` (matched on the indexed, lowercased
+    email; the newest CV when several share one) and replace the rows of each
+    section a record gives: a few bulk statements per chunk, whatever its size.
+    Returns (created, updated).
+    """
+    now = timezone.now()
+    existing = {}
+    matches = (
+        CVSubmission.objects.filter(email__in=[record.email for record in records])
+        .order_by('pk').values_list('email', 'pk')
+    )
+    for email, pk in matches:
+        existing[email] = pk
+
+    new, changed = [], []
+    for record in records:
+        record.cv.pk = existing.get(record.email)
+        if record.cv.pk:
+            record.cv.updated_at = now
+            changed.append(record.cv)
+        else:
+            new.append(record.cv)
+
+    with transaction.atomic(), batch_refresh():
+        CVSubmission.objects.bulk_create(new)
+        CVSubmission.objects.bulk_update(changed, ['name', 'tel_no', 'unit', 'age_bracket', 'updated_at'])
+        changed_pks = {cv.pk for cv in changed}
+        for section in CV_SECTIONS:
+            given = [record for record in records if section.name in record.sections]
+            replaced = [record.cv.pk for record in given if record.cv.pk in changed_pks]
+            if replaced:
+                section.model.objects.filter(cv_id__in=replaced).delete()
+            rows = []
+            for record in given:
+                for row in record.sections[section.name]:
+                    row.cv = record.cv
+                    rows.append(row)
+            section.model.objects.bulk_create(rows)
+        # Bulk writes send no signals: refresh the search documents and facets.
+        for record in records:
+            request_refresh(record.cv.pk)
+    return len(new), len(changed)
+
+
+def import_cvs(records, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, on_reject=None, on_progress=None):
+    """
+    Validate and write ``records`` (ImportRecords) in chunks of ``chunk_size``,
+    each in its own transaction. Rejected records are passed to
+    ``on_reject(reject)`` and skipped; ``on_progress(stats, read)`` is called
+    after each chunk. Returns the final ImportStats.
+    """
+    units = {name.lower(): pk for pk, name in Unit.objects.values_list('pk', 'name')}
+    seen = {}
+    created = updated = rejected = read = 0
+    chunk = []
+
+    def flush():
+        nonlocal created, updated
+        if chunk and not dry_run:
+            new, changed = write_chunk(chunk)
+            created += new
+            updated += changed
+        chunk.clear()
+
+    for record in records:
+        read += 1
+        result = validate_record(record, units)
+        if isinstance(result, ValidRecord) and result.email in seen:
+            result = Reject(record.line, result.email, f'email: Already imported from line {seen[result.email]}.')
+        if isinstance(result, Reject):
+            rejected += 1
+            if on_reject:
+                on_reject(result)
+            continue
+        seen[result.email] = result.line
+        chunk.append(result)
+        if len(chunk) >= chunk_size:
+            flush()
+            if on_progress:
+                on_progress(ImportStats(created, updated, rejected), read)
+    flush()
+    stats = ImportStats(created, updated, rejected)
+    if on_progress:
+        on_progress(stats, read)
+    return stats
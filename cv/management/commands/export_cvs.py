@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cv.export import EXPORT_FORMATS, write_export, xlsx_available
+from cv.models import CVSubmission, Unit, path_range
+
+
+class Command(BaseCommand):
+    help = 'Export CVs with all their sections as CSV, JSON lines or an Excel workbook.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write; standard output if omitted (not for xlsx).')
+        parser.add_argument('--status', choices=[value for value, _ in CVSubmission.STATUS_CHOICES])
+        parser.add_argument('--unit', type=int, help='Only CVs of this unit and the units under it.')
+
+    def handle(self, *args, **options):
+        format = options['format']
+        if format == 'xlsx' and not xlsx_available():
+            raise CommandError('Excel export needs openpyxl installed.')
+        if format == 'xlsx' and not options['output']:
+            raise CommandError('An Excel export must be written to a file: pass --output.')
+
+        queryset = CVSubmission.objects.all()
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        if options['unit']:
+            unit = Unit.objects.filter(pk=options['unit']).first()
+            if unit is None:
+                raise CommandError(f'No unit with id {options["unit"]}.')
+            queryset = queryset.filter(path_range(unit.path, 'unit__path'))
+
+        if not options['output']:
+            write_export(queryset, format, self.stdout)
+            return
+        if format == 'xlsx':
+            file = open(options['output'], 'wb')
+        else:
+            file = open(options['output'], 'w', encoding='utf-8', newline='')
+        with file:
+            write_export(queryset, format, file)
+        self.stderr.write(self.style.SUCCESS(f'Exported {queryset.count()} CV(s) to {options["output"]}.'))
@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cv.importer import IMPORT_CHUNK_SIZE, import_cvs, read_csv, read_jsonl
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+class Command(BaseCommand):
+    help = (
+        'Import CVs from CSV or JSON lines, creating them or updating the CV with the same email. '
+        'Sections given for a CV replace its rows of those sections; in CSV a section column holds '
+        'rows separated by ";" with fields separated by "|", in the order of the submission form '
+        '(a backslash escapes either inside a value), as export_cvs writes them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report rejects without writing.')
+
+    def handle(self, *args, **options):
+        format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if format not in READERS:
+            raise CommandError('Pass --format csv or --format jsonl.')
+
+        def on_reject(reject):
+            self.stderr.write(f'Line {reject.line} ({reject.email or "no email"}) rejected: {reject.errors}')
+
+        def on_progress(stats, read):
+            self.stdout.write(
+                f'{read} record(s) read: {stats.created} created, {stats.updated} updated, {stats.rejected} rejected.'
+            )
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            stats = import_cvs(
+                READERS[format](file), chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                on_reject=on_reject, on_progress=on_progress,
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: nothing written, {stats.rejected} record(s) rejected.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Imported {stats.created + stats.updated} CV(s), {stats.rejected} rejected.'
+            ))
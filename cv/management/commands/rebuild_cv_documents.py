@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cv.documents import rebuild_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-rendered reviewer document of every CV.'
+
+    def handle(self, *args, **options):
+        total = rebuild_documents()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the documents of {total} CV(s).'))
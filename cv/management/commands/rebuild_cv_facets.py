@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from cv.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute the expert-finder facets and facet counts of every CV.'
+
+    def handle(self, *args, **options):
+        total = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed facets of {total} CV(s).'))
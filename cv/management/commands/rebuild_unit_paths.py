@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cv.facets import rebuild_facets
+from cv.models import rebuild_unit_paths
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialised path and depth of every unit from the parent links, then the facets.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_unit_paths()
+            # Unit facets list each CV's units from the paths.
+            rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the paths of {total} unit(s).'))
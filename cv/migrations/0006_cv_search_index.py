@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+# Related names of the CV sections, as indexed by cv.search.
+SECTIONS = (
+    'languages', 'educations', 'trainings', 'computer_skills', 'research_areas', 'patents',
+    'grants', 'awards', 'memberships', 'projects', 'other_institutions',
+)
+
+
+def row_text(obj):
+    values = []
+    for field in obj._meta.concrete_fields:
+        if field.primary_key or field.is_relation:
+            continue
+        value = getattr(obj, field.attname)
+        if value in (None, ''):
+            continue
+        values.append(str(dict(field.flatchoices).get(value, value) if field.choices else value))
+    return ' '.join(values)
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases simply get no search index.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    CVSubmission = apps.get_model('cv', 'CVSubmission')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS cv_search USING fts5("
+            "name, contact, unit, content, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        rows = []
+        for cv in CVSubmission.objects.select_related('unit').prefetch_related(*SECTIONS).iterator(chunk_size=500):
+            content = '\n'.join(row_text(obj) for name in SECTIONS for obj in getattr(cv, name).all())
+            rows.append((cv.pk, cv.name, f'{cv.email} {cv.tel_no}', cv.unit.name if cv.unit else '', content))
+        cursor.executemany(
+            'INSERT INTO cv_search (rowid, name, contact, unit, content) VALUES (%s, %s, %s, %s, %s)', rows,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS cv_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0005_professionalproject_role_grant'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0006_cv_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value'), name='cv_facetcount_facet_value_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CVFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=200)),
+                ('cv', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='facets', to='cv.cvsubmission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cv', 'facet', 'value'], name='cv_facet_cv_facet_value_idx')],
+                'constraints': [models.UniqueConstraint(fields=('facet', 'value', 'cv'), name='cv_facet_value_cv_uniq')],
+            },
+        ),
+    ]
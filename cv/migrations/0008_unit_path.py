@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+def fill_unit_paths(apps, schema_editor):
+    Unit = apps.get_model('cv', 'Unit')
+    children = {}
+    for pk, parent_id in Unit.objects.values_list('pk', 'parent_id'):
+        children.setdefault(parent_id, []).append(pk)
+    stack = [(pk, '', 0) for pk in children.get(None, [])]
+    while stack:
+        pk, parent_path, depth = stack.pop()
+        path = f'{parent_path}{pk:06d}/'
+        Unit.objects.filter(pk=pk).update(path=path, depth=depth)
+        stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0007_cv_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unit',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_unit_paths, migrations.RunPython.noop),
+    ]
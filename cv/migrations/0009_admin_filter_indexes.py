@@ -0,0 +1,89 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:28
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0008_unit_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='award',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='computerskill',
+            name='proficiency',
+            field=models.CharField(choices=[('basic', 'Basic'), ('good', 'Good'), ('excellent', 'Excellent')], db_index=True, max_length=9),
+        ),
+        migrations.AlterField(
+            model_name='cvsubmission',
+            name='age_bracket',
+            field=models.CharField(choices=[('20-30', '20-30 years'), ('31-40', '31-40 years'), ('41-50', '41-50 years'), ('51-60', '51-60 years'), ('61+', '61+ years')], db_index=True, max_length=5),
+        ),
+        migrations.AlterField(
+            model_name='cvsubmission',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('reviewed', 'Reviewed'), ('approved', 'Approved')], db_index=True, default='submitted', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='cvsubmission',
+            name='submitted_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='education',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='grant',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='languageskill',
+            name='proficiency',
+            field=models.CharField(choices=[('basic', 'Basic'), ('intermediate', 'Intermediate'), ('fluent', 'Fluent')], db_index=True, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='patent',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='professionalmembership',
+            name='membership_type',
+            field=models.CharField(choices=[('graduate', 'Graduate Member'), ('associate', 'Associate Member'), ('full', 'Full Member'), ('fellow', 'Fellow')], db_index=True, max_length=9),
+        ),
+        migrations.AlterField(
+            model_name='professionalmembership',
+            name='year_joined',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='professionalproject',
+            name='end_year',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='professionalproject',
+            name='start_year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='training',
+            name='year',
+            field=models.PositiveIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1000), django.core.validators.MaxValueValidator(9999)]),
+        ),
+        migrations.AlterField(
+            model_name='unit',
+            name='unit_type',
+            field=models.CharField(choices=[('faculty', 'Faculty'), ('department', 'Department'), ('institute', 'Institute'), ('center', 'Center/Directorate')], db_index=True, max_length=20),
+        ),
+    ]
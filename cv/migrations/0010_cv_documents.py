@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:39
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0009_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVDocument',
+            fields=[
+                ('cv', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='document', serialize=False, to='cv.cvsubmission')),
+                ('version', models.DateTimeField()),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('html', models.TextField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
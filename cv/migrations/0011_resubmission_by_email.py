@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    # Resubmissions and imports match emails exactly, through the index.
+    CVSubmission = apps.get_model('cv', 'CVSubmission')
+    CVSubmission.objects.update(email=Lower('email'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0010_cv_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvsubmission',
+            name='submission_token',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='cvsubmission',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+        migrations.AddConstraint(
+            model_name='cvsubmission',
+            constraint=models.UniqueConstraint(condition=models.Q(('submission_token', ''), _negated=True), fields=('submission_token',), name='cv_submission_token_uniq'),
+        ),
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
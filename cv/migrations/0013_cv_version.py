@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0012_status_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvsubmission',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # Was the CV's updated_at. Every document is current when this runs,
+        # so each starts at version 0 along with its CV.
+        migrations.RemoveField(
+            model_name='cvdocument',
+            name='version',
+        ),
+        migrations.AddField(
+            model_name='cvdocument',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,57 @@
+from collections import Counter
+
+from django.db import migrations
+
+
+# The facets of cv.facets as of this migration; unit facets read Unit.path
+# (0008), so the backfill comes after it.
+PREFETCH = ('languages', 'educations', 'memberships', 'research_areas')
+
+
+def clean(text):
+    return ' '.join(text.split())
+
+
+def facet_values(cv):
+    units = []
+    if cv.unit is not None:
+        units = [str(int(segment)) for segment in cv.unit.path.split('/') if segment] or [str(cv.unit_id)]
+    values = [('unit', unit) for unit in units]
+    values.append(('age', cv.age_bracket))
+    values += [('language', f'{clean(skill.language).title()}:{skill.proficiency}') for skill in cv.languages.all()]
+    values += [('degree', clean(education.degree).replace('.', '').upper()) for education in cv.educations.all()]
+    values += [('membership', membership.membership_type) for membership in cv.memberships.all()]
+    values += [('research', clean(area.area).title()) for area in cv.research_areas.all()]
+    return {(facet, value[:200]) for facet, value in values if value}
+
+
+def fill_facets(apps, schema_editor):
+    CVSubmission = apps.get_model('cv', 'CVSubmission')
+    CVFacet = apps.get_model('cv', 'CVFacet')
+    FacetCount = apps.get_model('cv', 'FacetCount')
+    CVFacet.objects.all().delete()
+    FacetCount.objects.all().delete()
+    counts = Counter()
+    rows = []
+    for cv in CVSubmission.objects.select_related('unit').prefetch_related(*PREFETCH).iterator(chunk_size=500):
+        for facet, value in facet_values(cv):
+            rows.append(CVFacet(cv_id=cv.pk, facet=facet, value=value))
+            counts[facet, value] += 1
+        if len(rows) >= 5000:
+            CVFacet.objects.bulk_create(rows)
+            rows = []
+    CVFacet.objects.bulk_create(rows)
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0013_cv_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,54 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Concat, Substr
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .refresh import batch_refresh, request_refresh_many
+
+
+# Unit.path is the zero-padded pk of every unit from the root down, each
+# followed by a slash, e.g. '000003/000017/'. A subtree is the index range
+# [path, path + PATH_END): every character of a path sorts before '~'.
+PATH_END = '~'
+
+
+def path_segment(pk):
+    return f'{pk:06d}/'
+
+
+def path_range(path, field='path'):
+    """Q for the rows whose ``field`` starts with ``path``, as an index range."""
+    return Q(**{f'{field}__gte': path, f'{field}__lt': path + PATH_END})
+
+
+class UnitQuerySet(models.QuerySet):
+    def subtree(self, unit, include_self=True):
+        """``unit`` and every unit under it, in tree order."""
+        queryset = self.filter(path_range(unit.path))
+        if not include_self:
+            queryset = queryset.exclude(pk=unit.pk)
+        return queryset.order_by('path')
+
+    def ancestors(self, unit, include_self=False):
+        """The units above ``unit``, root first, read off its path."""
+        pks = [int(segment) for segment in unit.path.split('/') if segment]
+        if not include_self:
+            pks = pks[:-1]
+        return self.filter(pk__in=pks).order_by('depth')
+
+    def with_subtree_cv_counts(self):
+        """Annotate ``subtree_cv_count``: the CVs of each unit and all units under it."""
+        cvs = (
+            CVSubmission.objects
+            .filter(unit__path__gte=OuterRef('path'), unit__path__lt=Concat(OuterRef('path'), Value(PATH_END)))
+            .order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count')
+        )
+        return self.annotate(subtree_cv_count=Subquery(cvs, output_field=IntegerField()))
+
 
 class Unit(models.Model):
     UNIT_TYPE_CHOICES = [
@@ -10,16 +58,97 @@ class Unit(models.Model):
         ('center', 'Center/Directorate'),
     ]
     name = models.CharField(max_length=200, unique=True)
-    unit_type = models.CharField(max_length=20, choices=UNIT_TYPE_CHOICES)
+    unit_type = models.CharField(max_length=20, choices=UNIT_TYPE_CHOICES, db_index=True)
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
+    # Materialised path and depth (0 for a root), kept by save() and by the
+    # post_delete handler in cv.signals; see rebuild_unit_paths().
+    path = models.CharField(max_length=255, editable=False, default='', db_index=True)
+    depth = models.PositiveSmallIntegerField(editable=False, default=0)
+
+    objects = UnitQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name}"
 
+    def _parent_position(self):
+        if self.parent_id is None:
+            return '', -1
+        return Unit.objects.filter(pk=self.parent_id).values_list('path', 'depth').get()
+
+    def clean(self):
+        if self.pk and self.parent_id:
+            parent_path, _ = self._parent_position()
+            current = Unit.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+            if current and parent_path.startswith(current):
+                raise ValidationError({'parent': 'A unit cannot be placed under itself or one of its sub-units.'})
+
+    def save(self, *args, **kwargs):
+        # Batched so the CVs the post_save signal refreshes see the new path.
+        with transaction.atomic(), batch_refresh():
+            old_path, old_depth, old_name = '', 0, self.name
+            if self.pk:
+                old_path, old_depth, old_name = (
+                    Unit.objects.filter(pk=self.pk).values_list('path', 'depth', 'name').first() or ('', 0, self.name)
+                )
+            # Read by the post_save handler in cv.signals.
+            self._name_changed = old_name != self.name
+            parent_path, parent_depth = self._parent_position()
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError(f'{self} cannot be placed under itself or one of its sub-units.')
+
+            # The stored position, not a possibly stale in-memory one.
+            self.path, self.depth = old_path, old_depth
+            super().save(*args, **kwargs)
+
+            path, depth = parent_path + path_segment(self.pk), parent_depth + 1
+            if (path, depth) != (old_path, old_depth):
+                Unit.objects.filter(pk=self.pk).update(path=path, depth=depth)
+            if old_path and path != old_path:
+                # Moved: re-prefix the whole subtree in one statement.
+                Unit.objects.filter(path_range(old_path)).exclude(pk=self.pk).update(
+                    path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (depth - old_depth),
+                )
+                # Their unit facets list the units above them.
+                request_refresh_many(
+                    CVSubmission.objects.filter(path_range(path, 'unit__path')).values_list('pk', flat=True)
+                )
+            self.path, self.depth = path, depth
+
+
+def rebuild_unit_paths():
+    """
+    Recompute every unit's path and depth from the parent links. Units in a
+    parent cycle are made roots. Returns the number of units.
+    """
+    units = {pk: parent_id for pk, parent_id in Unit.objects.values_list('pk', 'parent_id')}
+    children = {}
+    for pk, parent_id in units.items():
+        children.setdefault(parent_id, []).append(pk)
+
+    positions = {}
+    stack = [(pk, '', 0) for pk in children.get(None, [])]
+    while stack:
+        pk, parent_path, depth = stack.pop()
+        path = parent_path + path_segment(pk)
+        positions[pk] = (path, depth)
+        stack.extend((child, path, depth + 1) for child in children.get(pk, []))
+
+    cycles = [pk for pk in units if pk not in positions]
+    if cycles:
+        Unit.objects.filter(pk__in=cycles).update(parent=None)
+        return rebuild_unit_paths()
+
+    objs = [Unit(pk=pk, path=path, depth=depth) for pk, (path, depth) in positions.items()]
+    Unit.objects.bulk_update(objs, ['path', 'depth'], batch_size=500)
+    return len(objs)
+
+
 class CVSubmission(models.Model):
     name = models.CharField(max_length=100)
     tel_no = models.CharField(max_length=20)
-    email = models.EmailField()
+    # Stored lowercased; a verified resubmission updates the CV with its email.
+    email = models.EmailField(db_index=True)
     unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True)
 
     AGE_BRACKETS = [
@@ -29,9 +158,13 @@ class CVSubmission(models.Model):
         ('51-60', '51-60 years'),
         ('61+', '61+ years'),
     ]
-    age_bracket = models.CharField(max_length=5, choices=AGE_BRACKETS)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    age_bracket = models.CharField(max_length=5, choices=AGE_BRACKETS, db_index=True)
+    submitted_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every refresh of the CV (see cv.refresh), including changes
+    # the applicant did not make, such as a renamed unit: its derived copies
+    # are versioned on this rather than on updated_at.
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -39,7 +172,27 @@ class CVSubmission(models.Model):
         ('reviewed', 'Reviewed'),
         ('approved', 'Approved'),
     ]
-    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='submitted')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='submitted', db_index=True)
+    # The statuses a reviewer may move a CV to, each with the statuses it may
+    # come from; cv.workflow puts them in the WHERE clause of its UPDATE.
+    STATUS_TRANSITIONS = {
+        'reviewed': ['submitted'],
+        'approved': ['reviewed'],
+        'submitted': ['reviewed', 'approved'],
+    }
+    # The idempotency token of the submission form last saved, so a repeated
+    # POST of that form is recognised and ignored.
+    submission_token = models.CharField(max_length=32, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['submission_token'], condition=~Q(submission_token=''), name='cv_submission_token_uniq',
+            ),
+        ]
+
+    def clean(self):
+        self.email = self.email.lower()
 
     def __str__(self):
         return f"{self.name} - {self.unit.name if self.unit else 'No Unit'}"
@@ -52,7 +205,7 @@ class LanguageSkill(models.Model):
         ('intermediate', 'Intermediate'),
         ('fluent', 'Fluent'),
     ]
-    proficiency = models.CharField(max_length=12, choices=PROFICIENCY_LEVELS)
+    proficiency = models.CharField(max_length=12, choices=PROFICIENCY_LEVELS, db_index=True)
 
     class Meta:
         unique_together = ('cv', 'language')
@@ -68,7 +221,7 @@ class ComputerSkill(models.Model):
         ('good', 'Good'),
         ('excellent', 'Excellent'),
     ]
-    proficiency = models.CharField(max_length=9, choices=PROFICIENCY_LEVELS)
+    proficiency = models.CharField(max_length=9, choices=PROFICIENCY_LEVELS, db_index=True)
 
     def __str__(self):
         return f"{self.skill} ({self.get_proficiency_display()})"
@@ -78,7 +231,8 @@ class Education(models.Model):
     institution = models.CharField(max_length=200)
     degree = models.CharField(max_length=100)
     year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     class Meta:
@@ -96,9 +250,10 @@ class ProfessionalMembership(models.Model):
         ('full', 'Full Member'),
         ('fellow', 'Fellow'),
     ]
-    membership_type = models.CharField(max_length=9, choices=MEMBERSHIP_TYPES)
+    membership_type = models.CharField(max_length=9, choices=MEMBERSHIP_TYPES, db_index=True)
     year_joined = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     def __str__(self):
@@ -116,7 +271,8 @@ class Training(models.Model):
     title = models.CharField(max_length=200)
     institution = models.CharField(max_length=150)
     year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     class Meta:
@@ -131,12 +287,14 @@ class ProfessionalProject(models.Model):
     role = models.CharField(max_length=200, null=True, blank=True)
     description = models.TextField()
     start_year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
     end_year = models.PositiveIntegerField(
         validators=[MinValueValidator(1000), MaxValueValidator(9999)],
         blank=True,
-        null=True
+        null=True,
+        db_index=True
     )
 
     def clean(self):
@@ -152,7 +310,8 @@ class Award(models.Model):
     name = models.CharField(max_length=200)
     organization = models.CharField(max_length=150)
     year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     class Meta:
@@ -166,7 +325,8 @@ class Grant(models.Model):
     title = models.CharField(max_length=200)
     amount = models.CharField(max_length=50, blank=True, null=True)
     year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     class Meta:
@@ -181,7 +341,8 @@ class Patent(models.Model):
     title = models.CharField(max_length=200)
     patent_number = models.CharField(max_length=50, blank=True, null=True)
     year = models.PositiveIntegerField(
-        validators=[MinValueValidator(1000), MaxValueValidator(9999)]
+        validators=[MinValueValidator(1000), MaxValueValidator(9999)],
+        db_index=True
     )
 
     class Meta:
@@ -197,3 +358,81 @@ class OtherInstitution(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.purpose}"
+
+
+class CVFacet(models.Model):
+    """
+    One value a CV has for one expert-finder facet, e.g. ('language',
+    'French:fluent'). Maintained by cv.facets from the CV and its sections.
+    """
+    # Not cascaded: cv.facets removes the rows of a deleted CV itself, so it
+    # can take them off FacetCount.
+    cv = models.ForeignKey(
+        CVSubmission, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='facets',
+    )
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=200)
+
+    class Meta:
+        constraints = [
+            # Also the index facet filters walk and probe.
+            models.UniqueConstraint(fields=['facet', 'value', 'cv'], name='cv_facet_value_cv_uniq'),
+        ]
+        indexes = [
+            # Counting the values of a set of CVs, and deleting by CV.
+            models.Index(fields=['cv', 'facet', 'value'], name='cv_facet_cv_facet_value_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}"
+
+
+class FacetCount(models.Model):
+    """How many CVs have each facet value; adjusted as CVFacet rows change."""
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='cv_facetcount_facet_value_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class CVDocument(models.Model):
+    """
+    A CV with its unit and every section, denormalised for the reviewer
+    pages: ``data`` as in the JSON export and ``html`` pre-rendered. Rebuilt
+    by cv.documents on every refresh of the CV; ``version`` is the CV's
+    version when it was built, so a copy older than the CV shows.
+    """
+    # Not cascaded, as for CVFacet: deleting a CV's rows refreshes the CV
+    # mid-delete, so cv.documents removes the document once the CV is gone.
+    cv = models.OneToOneField(
+        CVSubmission, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name='document',
+    )
+    version = models.PositiveIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    html = models.TextField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Document of CV {self.cv_id} (version {self.version})"
+
+
+class StatusChange(models.Model):
+    """One CV's move from one status to another, written by cv.workflow."""
+    cv = models.ForeignKey(CVSubmission, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=10, choices=CVSubmission.STATUS_CHOICES)
+    to_status = models.CharField(max_length=10, choices=CVSubmission.STATUS_CHOICES)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-changed_at']
+
+    def __str__(self):
+        return f"CV {self.cv_id}: {self.from_status} \u2192 {self.to_status}"
@@ -0,0 +1,76 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import F
+
+
+# Everything derived from a CV's rows (search document, facets, reviewer
+# document) is rebuilt from the database through refresh_cvs(), so one hook
+# keeps it all current.
+
+def refresh_cvs(cv_ids):
+    from .documents import refresh_documents
+    from .facets import refresh_cv_facets
+    from .models import CVSubmission
+    from .search import refresh_cv_documents
+
+    cv_ids = sorted(cv_ids)
+    # A change to any of a CV's rows is a change to the CV: it is what
+    # versions the CV's document. updated_at is left to the applicant's edits.
+    CVSubmission.objects.filter(pk__in=cv_ids).update(version=F('version') + 1)
+    refresh_cv_documents(cv_ids)
+    refresh_cv_facets(cv_ids)
+    refresh_documents(cv_ids)
+
+
+_batch = threading.local()
+
+
+@contextmanager
+def batch_refresh():
+    """
+    Collect the refreshes requested inside the block (e.g. by the signals of
+    every inline saved on one admin form) and run them once, at the end.
+    """
+    if getattr(_batch, 'cv_ids', None) is not None:
+        # Nested: the outermost block refreshes.
+        yield
+        return
+    _batch.cv_ids = set()
+    try:
+        yield
+        cv_ids = _batch.cv_ids
+    finally:
+        _batch.cv_ids = None
+    refresh_cvs(cv_ids)
+
+
+def request_refresh(cv_id):
+    if cv_id is None:
+        return
+    cv_ids = getattr(_batch, 'cv_ids', None)
+    if cv_ids is not None:
+        cv_ids.add(cv_id)
+    else:
+        refresh_cvs([cv_id])
+
+
+# CVs refreshed per queued job by request_refresh_many().
+REFRESH_JOB_SIZE = 500
+
+
+def request_refresh_many(cv_ids):
+    """
+    Refresh the given CVs, e.g. every CV under a renamed unit: with this
+    request if there are at most CV_INLINE_REFRESH_LIMIT of them, otherwise
+    in queued jobs (task cv.refresh_cvs) of REFRESH_JOB_SIZE each.
+    """
+    cv_ids = list(cv_ids)
+    if len(cv_ids) <= getattr(settings, 'CV_INLINE_REFRESH_LIMIT', 200):
+        for cv_id in cv_ids:
+            request_refresh(cv_id)
+        return
+    from .tasks import refresh_cv_batch
+    for start in range(0, len(cv_ids), REFRESH_JOB_SIZE):
+        refresh_cv_batch.enqueue(cv_ids=cv_ids[start:start + REFRESH_JOB_SIZE])
@@ -0,0 +1,94 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from website.search import match_expression
+
+from .formsets import CV_SECTIONS
+from .models import CVSubmission
+
+
+# FTS5 table with one row per CV (rowid = CV pk): who they are, and the text
+# of every section of the CV concatenated.
+SEARCH_TABLE = 'cv_search'
+
+REFRESH_CHUNK_SIZE = 500
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def _accessor(model):
+    return model._meta.get_field('cv').remote_field.get_accessor_name()
+
+
+SECTION_ACCESSORS = tuple(_accessor(section.model) for section in CV_SECTIONS)
+
+
+def row_text(obj):
+    """The searchable values of a section row: text, choice labels and years."""
+    values = []
+    for field in obj._meta.concrete_fields:
+        if field.primary_key or field.is_relation:
+            continue
+        value = getattr(obj, field.attname)
+        if value in (None, ''):
+            continue
+        values.append(str(getattr(obj, f'get_{field.name}_display')() if field.choices else value))
+    return ' '.join(values)
+
+
+def cv_document(cv):
+    """(name, contact, unit, content) of a CV with its sections prefetched."""
+    content = '\n'.join(
+        row_text(obj)
+        for accessor in SECTION_ACCESSORS
+        for obj in getattr(cv, accessor).all()
+    )
+    return cv.name, f'{cv.email} {cv.tel_no}', cv.unit.name if cv.unit else '', content
+
+
+def refresh_cv_documents(cv_ids):
+    """
+    Rewrite the search rows of the given CVs from the database; rows of CVs
+    that no longer exist are removed. Costs one query per section per chunk.
+    """
+    if not search_available():
+        return
+    cv_ids = list(cv_ids)
+    for start in range(0, len(cv_ids), REFRESH_CHUNK_SIZE):
+        chunk = cv_ids[start:start + REFRESH_CHUNK_SIZE]
+        cvs = (
+            CVSubmission.objects.filter(pk__in=chunk)
+            .select_related('unit')
+            .prefetch_related(*SECTION_ACCESSORS)
+        )
+        rows = [(cv.pk, *cv_document(cv)) for cv in cvs]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(pk,) for pk in chunk])
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, contact, unit, content) VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def rebuild_index():
+    """Re-index every CV. Returns the number of CVs indexed."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    cv_ids = list(CVSubmission.objects.order_by('pk').values_list('pk', flat=True))
+    refresh_cv_documents(cv_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return len(cv_ids)
+
+
+def matching_cvs(search_term):
+    """
+    A subquery of the pks of CVs matching every word of ``search_term``, or
+    None if the term has no words to match.
+    """
+    expression = match_expression(search_term)
+    if expression is None or not search_available():
+        return None
+    return RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
@@ -0,0 +1,54 @@
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from .formsets import CV_SECTIONS
+from .models import CVSubmission, Unit, path_range
+from .refresh import request_refresh, request_refresh_many
+
+
+def refresh_cv(sender, instance, **kwargs):
+    request_refresh(instance.pk)
+
+
+def refresh_parent_cv(sender, instance, **kwargs):
+    request_refresh(instance.cv_id)
+
+
+def refresh_unit_cvs(sender, instance, **kwargs):
+    # The unit name is part of the search document of every CV in it; Unit.save
+    # notes whether it changed (raw saves do not, so refresh).
+    if getattr(instance, '_name_changed', True):
+        request_refresh_many(CVSubmission.objects.filter(unit=instance).values_list('pk', flat=True))
+
+
+def remember_unit_cvs(sender, instance, **kwargs):
+    # Deleting the unit unsets their unit with an UPDATE that sends no signals,
+    # and the units under it lose it from their paths (and so unit facets).
+    instance._cv_ids = list(
+        CVSubmission.objects.filter(path_range(instance.path, 'unit__path')).values_list('pk', flat=True)
+        if instance.path else CVSubmission.objects.filter(unit=instance).values_list('pk', flat=True)
+    )
+
+
+def detach_unit_subtree(sender, instance, **kwargs):
+    """The deleted unit's children are roots now: drop its path from their subtrees."""
+    Unit.objects.filter(path_range(instance.path)).update(
+        path=Substr('path', len(instance.path) + 1),
+        depth=F('depth') - (instance.depth + 1),
+    )
+    request_refresh_many(getattr(instance, '_cv_ids', ()))
+
+
+def connect_signals():
+    # Keep the search index and facets in step with the CVs. Bulk writes send
+    # no signals: callers refresh explicitly (see cv.refresh).
+    post_save.connect(refresh_cv, sender=CVSubmission, dispatch_uid='search-save-cv')
+    post_delete.connect(refresh_cv, sender=CVSubmission, dispatch_uid='search-delete-cv')
+    post_save.connect(refresh_unit_cvs, sender=Unit, dispatch_uid='search-save-unit')
+    pre_delete.connect(remember_unit_cvs, sender=Unit, dispatch_uid='unit-delete-cvs')
+    post_delete.connect(detach_unit_subtree, sender=Unit, dispatch_uid='unit-delete-subtree')
+    for section in CV_SECTIONS:
+        label = section.model._meta.label_lower
+        post_save.connect(refresh_parent_cv, sender=section.model, dispatch_uid=f'search-save-{label}')
+        post_delete.connect(refresh_parent_cv, sender=section.model, dispatch_uid=f'search-delete-{label}')
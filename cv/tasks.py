@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+
+from jobs.queue import task
+
+from .models import CVSubmission
+from .refresh import refresh_cvs
+
+
+@task('cv.send_verification_email')
+def send_verification_email(email, code):
+    send_mail(
+        'ABUCONS CV Submission Verification',
+        f'Your verification code is: {code}',
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        fail_silently=False,
+    )
+
+
+@task('cv.send_status_emails')
+def send_status_emails(status, recipients):
+    """Tell each (name, email) of ``recipients`` their CV's new status, over one connection."""
+    label = dict(CVSubmission.STATUS_CHOICES)[status]
+    messages = [
+        EmailMessage(
+            f'ABUCONS CV {label}',
+            f'Dear {name},\n\nYour CV has been marked as {label.lower()}.',
+            settings.DEFAULT_FROM_EMAIL,
+            [email],
+        )
+        for name, email in recipients
+    ]
+    with get_connection() as connection:
+        connection.send_messages(messages)
+
+
+@task('cv.refresh_cvs')
+def refresh_cv_batch(cv_ids):
+    refresh_cvs(cv_ids)
@@ -1,3 +1,771 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from importlib import import_module
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from jobs.models import Job
+from jobs.queue import run_pending
+from jobs.testing import LocalSMTPServer
+
+from .export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, csv_lines, cv_record, flat_header, iter_cvs, write_xlsx
+from .facets import filter_cvs
+from .models import (
+    CVDocument, CVFacet, CVSubmission, Education, FacetCount, Grant, LanguageSkill, OtherInstitution, ProfessionalProject, ResearchArea,
+    StatusChange, Training, Unit, rebuild_unit_paths,
+)
+from .search import matching_cvs
+from .workflow import NOTIFY_BATCH_SIZE, change_status
+
+
+FORMSET_ROWS = {
+    'language': lambda i: {'language': f'Language {i}', 'proficiency': 'fluent'},
+    'education': lambda i: {'institution': f'University {i}', 'degree': 'PhD', 'year': 2000 + i},
+    'training': lambda i: {'title': f'Training {i}', 'institution': 'ITF', 'year': 2001},
+    'computer': lambda i: {'skill': f'Skill {i}', 'proficiency': 'good'},
+    'research': lambda i: {'area': f'Hydrology {i}'},
+    'patent': lambda i: {'title': f'Patent {i}', 'patent_number': f'NG{i}', 'year': 2010},
+    'grant': lambda i: {'title': f'Grant {i}', 'amount': '1000', 'year': 2011},
+    'award': lambda i: {'name': f'Award {i}', 'organization': 'NSE', 'year': 2012},
+    'membership': lambda i: {'organization': f'Society {i}', 'membership_type': 'full', 'year_joined': 2005},
+    'project': lambda i: {'title': f'Project {i}', 'role': 'Lead', 'description': 'Dam survey', 'start_year': 2015, 'end_year': 2016},
+    'institution': lambda i: {'name': f'Institution {i}', 'purpose': 'Consulting'},
+}
+
+
+def cv_post_data(rows, unit):
+    data = {'name': 'Amina Bello', 'tel_no': '08030000000', 'unit': unit.pk, 'age_bracket': '31-40'}
+    for prefix, row in FORMSET_ROWS.items():
+        data.update({
+            f'{prefix}-TOTAL_FORMS': rows,
+            f'{prefix}-INITIAL_FORMS': 0,
+            f'{prefix}-MIN_NUM_FORMS': 0,
+            f'{prefix}-MAX_NUM_FORMS': 1000,
+        })
+        for i in range(rows):
+            data.update({f'{prefix}-{i}-{field}': value for field, value in row(i).items()})
+    return data
+
+
+class CVSubmissionWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+
+    def setUp(self):
+        self.verify('amina@abu.edu.ng')
+
+    def verify(self, email):
+        session = self.client.session
+        session.update({'verified': True, 'verification_email': email, 'verified_email': email})
+        session.save()
+
+    def submit(self, rows=None, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/resource-persons/cv_submission/', data or cv_post_data(rows, self.unit))
+        self.assertRedirects(response, '/resource-persons/success/')
+        return len(queries)
+
+    def form_data(self):
+        """The POST data of the submission form as rendered, stored rows included."""
+        response = self.client.get('/resource-persons/cv_submission/')
+        forms = [response.context['cv_form']]
+        for _, formset, _ in response.context['sections']:
+            forms += [formset.management_form, *formset.forms]
+        data = {'submission_token': response.context['submission_token']}
+        for form in forms:
+            for name in form.fields:
+                value = form[name].value()
+                if value not in (None, False):
+                    data[form.add_prefix(name)] = value
+        return data
+
+    def test_form_carries_an_empty_row_per_section(self):
+        response = self.client.get('/resource-persons/cv_submission/')
+        self.assertContains(response, 'id="empty-research-form"')
+        self.assertContains(response, 'research-__prefix__-area')
+
+    def test_submission_is_saved_with_all_children(self):
+        self.submit(rows=3)
+        cv = CVSubmission.objects.get()
+        self.assertEqual(cv.email, 'amina@abu.edu.ng')
+        self.assertEqual(cv.languages.count(), 3)
+        self.assertEqual(cv.projects.count(), 3)
+        self.assertEqual(cv.research_areas.count(), 3)
+
+    def test_write_statements_do_not_grow_with_cv_size(self):
+        small = self.submit(rows=1)
+        self.verify('bello@abu.edu.ng')
+        large = self.submit(rows=10)
+        self.assertEqual(small, large)
+        self.assertEqual(CVSubmission.objects.last().trainings.count(), 10)
+
+    def test_resubmission_updates_changed_rows_only(self):
+        self.submit(rows=2)
+        cv = CVSubmission.objects.get()
+        languages = dict(cv.languages.values_list('language', 'pk'))
+
+        data = self.form_data()
+        data['language-0-proficiency'] = 'basic'
+        data['research-1-DELETE'] = 'on'
+        data.update({'award-2-name': 'Award 2', 'award-2-organization': 'NSE', 'award-2-year': 2013})
+        self.submit(data=data)
+
+        self.assertEqual(CVSubmission.objects.get(), cv)
+        self.assertEqual(dict(cv.languages.values_list('language', 'pk')), languages)
+        self.assertEqual(cv.languages.get(language='Language 0').proficiency, 'basic')
+        self.assertEqual(cv.research_areas.count(), 1)
+        self.assertEqual(cv.awards.count(), 3)
+        self.assertEqual(cv.trainings.count(), 2)
+
+    def test_switching_email_after_verifying_gives_no_access(self):
+        self.submit(rows=1)
+        self.client.session.flush()
+        self.client.post('/resource-persons/', {'email': 'someone@abu.edu.ng'})
+        code = self.client.session['verification_code']
+        self.assertRedirects(
+            self.client.post('/resource-persons/verify-code/', {'verification_code': code}),
+            '/resource-persons/cv_submission/',
+        )
+        self.client.post('/resource-persons/', {'email': 'amina@abu.edu.ng'})
+        response = self.client.get('/resource-persons/cv_submission/')
+        self.assertRedirects(response, '/resource-persons/')
+        self.assertRedirects(self.client.post('/resource-persons/cv_submission/', cv_post_data(1, self.unit)), '/resource-persons/')
+        # Nor does a wrong code.
+        self.client.post('/resource-persons/verify-code/', {'verification_code': ''})
+        self.assertRedirects(self.client.get('/resource-persons/cv_submission/'), '/resource-persons/')
+        self.assertEqual(CVSubmission.objects.get().name, 'Amina Bello')
+
+    def test_repeated_post_is_a_no_op(self):
+        self.submit(rows=1)
+        data = self.form_data()
+        data['award-1-name'] = 'Award 1'
+        data.update({'award-1-organization': 'NSE', 'award-1-year': 2013})
+        self.submit(data=data)
+        updated_at = CVSubmission.objects.get().updated_at
+        response = self.client.post('/resource-persons/cv_submission/', data)
+        self.assertRedirects(response, '/resource-persons/success/')
+        cv = CVSubmission.objects.get()
+        self.assertEqual(cv.updated_at, updated_at)
+        self.assertEqual(cv.awards.count(), 2)
+
+
+class CVSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+
+    def setUp(self):
+        session = self.client.session
+        session.update({'verified': True, 'verification_email': 'amina@abu.edu.ng', 'verified_email': 'amina@abu.edu.ng'})
+        session.save()
+        self.client.post('/resource-persons/cv_submission/', cv_post_data(2, self.unit))
+        self.cv = CVSubmission.objects.get()
+        self.client.force_login(self.admin)
+
+    def search(self, term):
+        response = self.client.get('/admin/cv/cvsubmission/', {'q': term})
+        return list(response.context['cl'].result_list)
+
+    def test_bulk_saved_sections_are_searchable(self):
+        self.assertEqual(self.search('hydrology'), [self.cv])
+        self.assertEqual(self.search('dam survey'), [self.cv])
+        self.assertEqual(self.search('engineering'), [self.cv])
+        self.assertEqual(self.search('geology'), [])
+
+    def test_contacts_match_by_substring(self):
+        self.assertEqual(self.search('3000000'), [self.cv])
+        self.assertEqual(self.search('abu.edu'), [self.cv])
+        self.assertEqual(self.search('4000000'), [])
+
+    def test_index_follows_section_changes(self):
+        ResearchArea.objects.create(cv=self.cv, area='Geology')
+        self.assertEqual(self.search('geology'), [self.cv])
+        self.cv.research_areas.all().delete()
+        self.assertEqual(self.search('hydrology'), [])
+        self.cv.delete()
+        self.assertEqual(self.search('amina'), [])
+
+
+class ExpertFinderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineering = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+        cls.science = Unit.objects.create(name='Faculty of Science', unit_type='faculty')
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+
+    def add_cv(self, name, unit, language, proficiency, degree):
+        cv = CVSubmission.objects.create(name=name, tel_no='080', email=f'{name}@abu.edu.ng', unit=unit, age_bracket='31-40')
+        LanguageSkill.objects.create(cv=cv, language=language, proficiency=proficiency)
+        Education.objects.create(cv=cv, institution='ABU', degree=degree, year=2010)
+        return cv
+
+    def count(self, facet, value):
+        row = FacetCount.objects.filter(facet=facet, value=value).first()
+        return row.count if row else 0
+
+    def test_combined_filters(self):
+        match = self.add_cv('amina', self.engineering, 'french', 'fluent', 'Ph.D')
+        self.add_cv('bello', self.engineering, 'French', 'basic', 'PhD')
+        self.add_cv('chidi', self.science, 'French', 'fluent', 'PhD')
+        selection = {'language': ['French:fluent'], 'degree': ['PHD'], 'unit': [str(self.engineering.pk)]}
+        self.assertEqual(list(filter_cvs(selection)), [match])
+
+    def test_counts_follow_changes(self):
+        cv = self.add_cv('amina', self.engineering, 'French', 'fluent', 'PhD')
+        self.add_cv('bello', self.science, 'French', 'fluent', 'MSc')
+        self.assertEqual(self.count('language', 'French:fluent'), 2)
+        self.assertEqual(self.count('degree', 'PHD'), 1)
+
+        cv.educations.update(degree='MSc')  # bulk: no signals
+        Education.objects.create(cv=cv, institution='ABU', degree='MSc', year=2012)
+        self.assertEqual(self.count('degree', 'PHD'), 0)
+        self.assertEqual(self.count('degree', 'MSC'), 2)
+
+        cv.delete()
+        self.assertEqual(self.count('language', 'French:fluent'), 1)
+        self.assertEqual(self.count('unit', str(self.engineering.pk)), 0)
+
+    def test_unit_facet_covers_sub_units(self):
+        civil = Unit.objects.create(name='Department of Civil Engineering', unit_type='department', parent=self.engineering)
+        survey = Unit.objects.create(name='Survey Unit', unit_type='center', parent=civil)
+        amina = self.add_cv('amina', survey, 'French', 'fluent', 'PhD')
+        bello = self.add_cv('bello', self.engineering, 'French', 'fluent', 'PhD')
+        self.add_cv('chidi', self.science, 'French', 'fluent', 'PhD')
+        self.assertEqual(set(filter_cvs({'unit': [str(self.engineering.pk)]})), {amina, bello})
+        self.assertEqual(list(filter_cvs({'unit': [str(civil.pk)]})), [amina])
+        self.assertEqual(self.count('unit', str(self.engineering.pk)), 2)
+
+        # Moving a sub-unit moves its CVs' counts with it.
+        civil.parent = self.science
+        civil.save()
+        self.assertEqual(self.count('unit', str(self.engineering.pk)), 1)
+        self.assertEqual(self.count('unit', str(self.science.pk)), 2)
+        self.assertEqual(
+            list(filter_cvs({'unit': [str(self.science.pk)]}).values_list('name', flat=True).order_by('name')),
+            ['amina', 'chidi'],
+        )
+
+        # Deleting it leaves its sub-units as roots.
+        civil.delete()
+        self.assertEqual(self.count('unit', str(self.science.pk)), 1)
+        self.assertEqual(list(filter_cvs({'unit': [str(survey.pk)]})), [amina])
+        self.assertEqual(self.count('unit', str(civil.pk)), 0)
+
+    def test_migration_backfills_facets(self):
+        civil = Unit.objects.create(name='Department of Civil Engineering', unit_type='department', parent=self.engineering)
+        self.add_cv('amina', civil, 'french', 'fluent', 'Ph.D')
+        self.add_cv('bello', self.science, 'French', 'basic', 'MSc')
+        cv = self.add_cv('chidi', None, 'Hausa', 'fluent', 'PhD')
+        ResearchArea.objects.create(cv=cv, area='hydrology')
+        facets = set(CVFacet.objects.values_list('cv', 'facet', 'value'))
+        counts = set(FacetCount.objects.exclude(count=0).values_list('facet', 'value', 'count'))
+
+        backfill = import_module('cv.migrations.0014_backfill_cv_facets')
+        backfill.fill_facets(apps, None)
+        self.assertEqual(set(CVFacet.objects.values_list('cv', 'facet', 'value')), facets)
+        self.assertEqual(set(FacetCount.objects.values_list('facet', 'value', 'count')), counts)
+
+    def test_page(self):
+        self.add_cv('amina', self.engineering, 'French', 'fluent', 'PhD')
+        self.client.force_login(self.admin)
+        response = self.client.get('/resource-persons/experts/', {'language': 'French:fluent'})
+        self.assertContains(response, 'amina@abu.edu.ng')
+        self.assertContains(response, 'French (Fluent) (1)')
+
+
+class UnitHierarchyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+        cls.department = Unit.objects.create(name='Civil Engineering', unit_type='department', parent=cls.faculty)
+        cls.centre = Unit.objects.create(name='Water Resources Centre', unit_type='centre', parent=cls.department)
+        cls.science = Unit.objects.create(name='Faculty of Science', unit_type='faculty')
+
+    def paths(self):
+        return dict(Unit.objects.values_list('name', 'path'))
+
+    def test_paths_follow_moves_and_deletes(self):
+        self.assertEqual(self.centre.path, f'{self.faculty.pk:06d}/{self.department.pk:06d}/{self.centre.pk:06d}/')
+        self.assertEqual(self.centre.depth, 2)
+
+        self.department.parent = self.science
+        self.department.save()
+        self.centre.refresh_from_db()
+        self.assertTrue(self.centre.path.startswith(self.science.path))
+        self.assertEqual(list(Unit.objects.ancestors(self.centre)), [self.science, self.department])
+
+        before = self.paths()
+        Unit.objects.update(path='', depth=0)
+        rebuild_unit_paths()
+        self.assertEqual(self.paths(), before)
+
+        self.department.delete()
+        self.centre.refresh_from_db()
+        self.assertEqual((self.centre.path, self.centre.depth), (f'{self.centre.pk:06d}/', 0))
+
+    def test_unit_cannot_move_under_its_subtree(self):
+        self.faculty.parent = self.centre
+        with self.assertRaises(ValueError):
+            self.faculty.save()
+
+    def test_subtree_cvs(self):
+        for name, unit in [('amina', self.faculty), ('bello', self.centre), ('chidi', self.science)]:
+            CVSubmission.objects.create(name=name, tel_no='080', email=f'{name}@abu.edu.ng', unit=unit, age_bracket='31-40')
+        self.assertEqual(list(Unit.objects.subtree(self.faculty)), [self.faculty, self.department, self.centre])
+        counts = dict(Unit.objects.with_subtree_cv_counts().values_list('name', 'subtree_cv_count'))
+        self.assertEqual(counts, {
+            'Faculty of Engineering': 2, 'Civil Engineering': 1, 'Water Resources Centre': 1, 'Faculty of Science': 1,
+        })
+
+        self.client.force_login(User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret'))
+        response = self.client.get('/admin/cv/cvsubmission/', {'unit_tree': self.department.pk})
+        self.assertEqual({cv.name for cv in response.context['cl'].result_list}, {'bello'})
+        response = self.client.get('/admin/cv/cvsubmission/', {'unit_tree': 'abc'})
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+        response = self.client.get('/admin/cv/unit/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cvs_are_refreshed_only_for_a_new_name(self):
+        for name in ['amina', 'bello']:
+            CVSubmission.objects.create(name=name, tel_no='080', email=f'{name}@abu.edu.ng', unit=self.centre, age_bracket='31-40')
+
+        def in_unit(term):
+            return set(CVSubmission.objects.filter(pk__in=matching_cvs(term)).values_list('name', flat=True))
+
+        def stamps():
+            return list(CVSubmission.objects.order_by('pk').values_list('version', flat=True))
+
+        before = stamps()
+        self.centre.unit_type = 'institute'
+        self.centre.save()
+        self.assertEqual(stamps(), before)
+
+        self.centre.name = 'Hydraulics Centre'
+        self.centre.save()
+        self.assertEqual(in_unit('hydraulics'), {'amina', 'bello'})
+
+        with override_settings(CV_INLINE_REFRESH_LIMIT=1):
+            self.centre.name = 'Dams Centre'
+            self.centre.save()
+        self.assertEqual(in_unit('dams'), set())
+        self.assertEqual(Job.objects.filter(task='cv.refresh_cvs').count(), 1)
+        run_pending()
+        self.assertEqual(in_unit('dams'), {'amina', 'bello'})
+
+
+class AdminQueryBudgetTests(TestCase):
+    # Session, user, row estimate, count and page, plus the unit filter's
+    # choices and the date hierarchy's two on the CV list.
+    BUDGETS = {
+        'cvsubmission': 8, 'unit': 5,
+        'languageskill': 5, 'education': 5, 'professionalproject': 5, 'grant': 5, 'otherinstitution': 5,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+
+    def add_cvs(self, count):
+        start = CVSubmission.objects.count()
+        for i in range(start, start + count):
+            unit = Unit.objects.create(name=f'Department {i}', unit_type='department')
+            cv = CVSubmission.objects.create(name=f'cv{i}', tel_no='080', email=f'cv{i}@abu.edu.ng', unit=unit, age_bracket='31-40')
+            LanguageSkill.objects.create(cv=cv, language='French', proficiency='fluent')
+            Education.objects.create(cv=cv, institution='ABU', degree='PhD', year=1990 + i)
+            ProfessionalProject.objects.create(cv=cv, title='Survey', description='Dam', start_year=2000, end_year=2001)
+            Grant.objects.create(cv=cv, title='Grant', year=2010)
+            OtherInstitution.objects.create(cv=cv, name='NSE', purpose='Consulting')
+
+    def changelist_queries(self, model):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/cv/{model}/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.admin)
+        self.add_cvs(2)
+        small = {model: self.changelist_queries(model) for model in self.BUDGETS}
+        self.add_cvs(30)
+        large = {model: self.changelist_queries(model) for model in self.BUDGETS}
+        self.assertEqual(small, large)
+        self.assertEqual(large, self.BUDGETS)
+
+    def test_decade_filter(self):
+        self.client.force_login(self.admin)
+        self.add_cvs(12)
+        response = self.client.get('/admin/cv/education/', {'year__gte': 2000, 'year__lt': 2010})
+        self.assertEqual(sorted(obj.year for obj in response.context['cl'].result_list), list(range(2000, 2002)))
+        self.assertContains(response, 'Before 1960')
+
+
+class CVSectionAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+        cls.cv = CVSubmission.objects.create(name='amina', tel_no='080', email='amina@abu.edu.ng', age_bracket='31-40')
+        Training.objects.bulk_create([
+            Training(cv=cls.cv, title=f'Training {i}', institution='ITF', year=2001) for i in range(45)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def change_page_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/cv/cvsubmission/{self.cv.pk}/change/')
+        self.assertContains(response, 'Additional Qualifications/Trainings with Certificate</strong> (')
+        return len(queries)
+
+    def test_change_page_does_not_grow_with_cv(self):
+        self.change_page_queries()  # warm the content type cache
+        small = self.change_page_queries()
+        Grant.objects.bulk_create([Grant(cv=self.cv, title=f'Grant {i}', year=2011) for i in range(30)])
+        self.assertEqual(self.change_page_queries(), small)
+
+    def test_section_is_paginated_and_saved_alone(self):
+        url = f'/admin/cv/cvsubmission/{self.cv.pk}/section/training/'
+        response = self.client.get(url, {'page': 3})
+        forms = response.context['formset'].forms
+        self.assertEqual(len(forms), 5)
+        self.assertContains(response, 'Rows 41&ndash;45 of 45')
+
+        data = {
+            'training-TOTAL_FORMS': 6, 'training-INITIAL_FORMS': 5,
+            'training-MIN_NUM_FORMS': 0, 'training-MAX_NUM_FORMS': 1000,
+        }
+        for i, form in enumerate(forms):
+            data.update({
+                f'training-{i}-id': form.instance.pk, f'training-{i}-title': form.instance.title,
+                f'training-{i}-institution': 'ITF', f'training-{i}-year': 2001,
+            })
+        data['training-0-title'] = 'Renamed'
+        data['training-1-DELETE'] = 'on'
+        data.update({'training-5-title': 'New', 'training-5-institution': 'NSE', 'training-5-year': 2020})
+        response = self.client.post(f'{url}?page=3', data)
+        self.assertRedirects(response, f'{url}?page=3&saved=1')
+
+        titles = set(self.cv.trainings.values_list('title', flat=True))
+        self.assertEqual(len(titles), 45)
+        self.assertIn('Renamed', titles)
+        self.assertIn('New', titles)
+        self.assertNotIn(forms[1].instance.title, titles)
+
+    def delete_queries(self, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def add_cv(self, name, rows):
+        cv = CVSubmission.objects.create(name=name, tel_no='080', email=f'{name}@abu.edu.ng', age_bracket='31-40')
+        Training.objects.bulk_create([Training(cv=cv, title=f'Training {i}', institution='ITF', year=2001) for i in range(rows)])
+        return cv
+
+    def test_deletes_refresh_once(self):
+        warm, small, large = self.add_cv('abba', 1), self.add_cv('bello', 2), self.add_cv('chidi', 40)
+        self.delete_queries(f'/admin/cv/cvsubmission/{warm.pk}/delete/', {'post': 'yes'})  # warm the content type cache
+        self.assertEqual(
+            self.delete_queries(f'/admin/cv/cvsubmission/{small.pk}/delete/', {'post': 'yes'}),
+            self.delete_queries(f'/admin/cv/cvsubmission/{large.pk}/delete/', {'post': 'yes'}),
+        )
+
+        warm, small, large = (list(self.cv.trainings.order_by('pk')[i:j]) for i, j in [(0, 1), (1, 3), (3, 43)])
+        action = {'action': 'delete_selected', 'post': 'yes'}
+        self.delete_queries('/admin/cv/training/', {**action, '_selected_action': [row.pk for row in warm]})
+        self.assertEqual(
+            self.delete_queries('/admin/cv/training/', {**action, '_selected_action': [row.pk for row in small]}),
+            self.delete_queries('/admin/cv/training/', {**action, '_selected_action': [row.pk for row in large]}),
+        )
+        self.assertEqual(self.cv.trainings.count(), 2)
+
+
+class CVExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+        cls.unit = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+        cvs = CVSubmission.objects.bulk_create([
+            CVSubmission(name=f'cv{i}', tel_no='080', email=f'cv{i}@abu.edu.ng', unit=cls.unit, age_bracket='31-40')
+            for i in range(EXPORT_CHUNK_SIZE + 3)
+        ])
+        LanguageSkill.objects.bulk_create([LanguageSkill(cv=cv, language='French', proficiency='fluent') for cv in cvs])
+        Education.objects.bulk_create([
+            Education(cv=cvs[0], institution='ABU', degree=degree, year=year) for degree, year in [('BSc', 2005), ('PhD', 2010)]
+        ])
+
+    def test_jsonl_command(self):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('export_cvs', format='jsonl', stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), EXPORT_CHUNK_SIZE + 3)
+        self.assertEqual(records[0]['unit'], 'Faculty of Engineering')
+        self.assertEqual([row['degree'] for row in records[0]['education']], ['PhD', 'BSc'])
+        self.assertEqual(records[-1]['language'], [{'language': 'French', 'proficiency': 'fluent'}])
+        # Two chunks, each one CV query plus one per section.
+        self.assertEqual(len(queries), 2 * 12)
+
+    def test_csv_admin_action(self):
+        self.client.force_login(self.admin)
+        cv = CVSubmission.objects.order_by('pk').first()
+        response = self.client.post('/admin/cv/cvsubmission/', {
+            'action': 'export_csv', '_selected_action': [cv.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], str(cv.pk))
+        self.assertEqual(rows[1][rows[0].index('education')], 'ABU | PhD | 2010; ABU | BSc | 2005')
+
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        file = io.BytesIO()
+        write_xlsx(CVSubmission.objects.filter(email='cv0@abu.edu.ng'), file)
+        header, row = load_workbook(file, read_only=True)['CVs'].values
+        self.assertEqual(list(header), flat_header())
+        record = dict(zip(header, row))
+        self.assertEqual(record['unit'], 'Faculty of Engineering')
+        self.assertEqual(record['education'], 'ABU | PhD | 2010; ABU | BSc | 2005')
+        self.assertIsNone(record['submitted_at'].tzinfo)
+
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/cv/cvsubmission/', {'action': 'export_xlsx', '_selected_action': [row[0]]})
+        self.assertEqual(response['Content-Type'], EXPORT_FORMATS['xlsx'])
+        self.assertEqual(len(list(load_workbook(io.BytesIO(b''.join(response.streaming_content)))['CVs'].values)), 2)
+
+
+class CVImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.unit = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+
+    def run_import(self, name, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_cvs', path, chunk_size=2, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_with_rejects(self):
+        out, err = self.run_import('roster.csv', (
+            'name,email,tel_no,unit,age_bracket,language,education\n'
+            'Amina Bello,Amina@abu.edu.ng,080,faculty of engineering,31-40,French | fluent; Hausa | basic,ABU | PhD | 2010\n'
+            'Bello Musa,not-an-email,080,,31-40,,\n'
+            'Chidi Okafor,chidi@abu.edu.ng,080,Faculty of Law,99,French | fluent; French | basic,\n'
+            'Dayo Ade,dayo@abu.edu.ng,080,,41-50,,ABU | MSc | 1000000\n'
+        ))
+        self.assertIn('Imported 1 CV(s), 3 rejected.', out)
+        self.assertIn('Line 3 (not-an-email) rejected: email: Enter a valid email address.', err)
+        self.assertIn('unit: No unit named "Faculty of Law".', err)
+        self.assertIn('age_bracket: Select a valid choice.', err)
+        self.assertIn('language: French is listed twice.', err)
+        self.assertIn('Line 5 (dayo@abu.edu.ng) rejected: education 1 year:', err)
+
+        cv = CVSubmission.objects.get()
+        self.assertEqual((cv.email, cv.unit), ('amina@abu.edu.ng', self.unit))
+        self.assertEqual(sorted(cv.languages.values_list('language', 'proficiency')), [('French', 'fluent'), ('Hausa', 'basic')])
+        self.assertEqual(cv.educations.get().year, 2010)
+        self.assertEqual(FacetCount.objects.get(facet='language', value='French:fluent').count, 1)
+
+    def test_jsonl_upserts_by_email(self):
+        cv = CVSubmission.objects.create(name='Amina', tel_no='080', email='amina@abu.edu.ng', age_bracket='31-40')
+        LanguageSkill.objects.create(cv=cv, language='French', proficiency='fluent')
+        ResearchArea.objects.create(cv=cv, area='Hydrology')
+        records = [
+            {'name': 'Amina Bello', 'email': 'amina@abu.edu.ng', 'tel_no': '081', 'age_bracket': '41-50',
+             'language': [{'language': 'Hausa', 'proficiency': 'fluent'}]},
+            {'name': 'Bello', 'email': 'bello@abu.edu.ng', 'tel_no': '080', 'age_bracket': '31-40', 'research': []},
+            {'name': 'Chidi', 'email': 'chidi@abu.edu.ng', 'tel_no': '080', 'age_bracket': '31-40'},
+        ]
+        out, err = self.run_import('cvs.jsonl', '\n'.join(json.dumps(record) for record in records) + '\nnot json\n')
+        self.assertIn('Imported 3 CV(s), 1 rejected.', out)
+        self.assertIn('Line 4 (no email) rejected: Invalid JSON', err)
+
+        cv.refresh_from_db()
+        self.assertEqual((cv.name, cv.tel_no, cv.age_bracket), ('Amina Bello', '081', '41-50'))
+        # Given sections replace the CV's rows; others are left alone.
+        self.assertEqual(list(cv.languages.values_list('language', flat=True)), ['Hausa'])
+        self.assertEqual(list(cv.research_areas.values_list('area', flat=True)), ['Hydrology'])
+        self.assertEqual(CVSubmission.objects.count(), 3)
+
+    def test_csv_export_round_trip(self):
+        cv = CVSubmission.objects.create(
+            name='Amina Bello', tel_no='080', email='amina@abu.edu.ng', unit=self.unit, age_bracket='31-40',
+        )
+        LanguageSkill.objects.create(cv=cv, language='French', proficiency='fluent')
+        LanguageSkill.objects.create(cv=cv, language='Hausa', proficiency='basic')
+        Education.objects.create(cv=cv, institution='ABU', degree='PhD', year=2010)
+        Grant.objects.create(cv=cv, title='Dam safety', amount=None, year=2015)
+        ProfessionalProject.objects.create(
+            cv=cv, title='Kaduna | Zaria road', description='Dams; levees \\ spillways', start_year=2012,
+        )
+
+        def records():
+            ignored = ('id', 'status', 'submitted_at', 'updated_at')
+            return [
+                {key: value for key, value in cv_record(cv, rows).items() if key not in ignored}
+                for cv, rows in iter_cvs(CVSubmission.objects.all())
+            ]
+
+        exported = records()
+        content = ''.join(csv_lines(CVSubmission.objects.all()))
+        cv.delete()
+        out, err = self.run_import('export.csv', content)
+        self.assertIn('Imported 1 CV(s), 0 rejected.', out)
+        self.assertEqual(err, '')
+        self.assertEqual(records(), exported)
+
+
+class CVDocumentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+        cls.unit = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.cv = CVSubmission.objects.create(name='Amina Bello', tel_no='080', email='amina@abu.edu.ng', unit=self.unit, age_bracket='31-40')
+        LanguageSkill.objects.create(cv=self.cv, language='French', proficiency='fluent')
+
+    def test_document_follows_changes(self):
+        document = CVDocument.objects.get(cv=self.cv)
+        self.cv.refresh_from_db()
+        self.assertEqual(document.version, self.cv.version)
+        self.assertEqual(document.data['language'], [{'language': 'French', 'proficiency': 'fluent'}])
+        self.assertIn('<td>Fluent</td>', document.html)
+
+        Education.objects.create(cv=self.cv, institution='ABU', degree='PhD', year=2010)
+        document.refresh_from_db()
+        self.assertIn('Tertiary Education', document.html)
+        self.assertGreater(document.version, self.cv.version)
+
+        # A refresh the applicant did not cause leaves their last update alone.
+        self.unit.name = 'Faculty of Engineering and Technology'
+        self.unit.save()
+        document.refresh_from_db()
+        self.assertIn('Faculty of Engineering and Technology', document.html)
+        self.assertEqual(CVSubmission.objects.get(pk=self.cv.pk).updated_at, self.cv.updated_at)
+
+        self.cv.delete()
+        self.assertFalse(CVDocument.objects.exists())
+
+    def test_page_reads_one_row(self):
+        self.client.get(f'/resource-persons/cvs/{self.cv.pk}/')  # warm the session
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/resource-persons/cvs/{self.cv.pk}/')
+        self.assertContains(response, 'Faculty of Engineering')
+        # Session, user and the document.
+        self.assertEqual(len(queries), 3)
+
+    def test_stale_document_is_rebuilt(self):
+        # A bulk update sends no signals.
+        CVSubmission.objects.filter(pk=self.cv.pk).update(name='Amina B. Bello', version=F('version') + 1)
+        response = self.client.get(f'/resource-persons/cvs/{self.cv.pk}/print/')
+        self.assertContains(response, 'Amina B. Bello')
+        self.assertEqual(self.client.get('/resource-persons/cvs/999/').status_code, 404)
+
+
+class StatusWorkflowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret')
+        cls.engineering = Unit.objects.create(name='Faculty of Engineering', unit_type='faculty')
+        cls.science = Unit.objects.create(name='Faculty of Science', unit_type='faculty')
+
+    def add_cvs(self, count, unit, status):
+        start = CVSubmission.objects.count()
+        CVSubmission.objects.bulk_create([
+            CVSubmission(name=f'cv{i}', tel_no='080', email=f'cv{i}@abu.edu.ng', unit=unit, age_bracket='31-40', status=status)
+            for i in range(start, start + count)
+        ])
+
+    def act(self, action):
+        # The "select all" of a filtered changelist.
+        return self.client.post(f'/admin/cv/cvsubmission/?unit_tree={self.engineering.pk}', {
+            'action': action, 'select_across': 1, 'index': 0,
+            '_selected_action': list(CVSubmission.objects.values_list('pk', flat=True)[:1]),
+        }, follow=True)
+
+    def test_bulk_approval_is_set_based(self):
+        self.client.force_login(self.admin)
+        self.add_cvs(NOTIFY_BATCH_SIZE + 5, self.engineering, 'reviewed')
+        self.add_cvs(3, self.engineering, 'submitted')
+        self.add_cvs(4, self.science, 'reviewed')
+        updated = dict(CVSubmission.objects.values_list('pk', 'updated_at'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.act('mark_approved_and_notify')
+        self.assertContains(response, f'Marked {NOTIFY_BATCH_SIZE + 5} CV(s) as approved.')
+        writes = [query['sql'].split()[0] for query in queries if not query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+        # One UPDATE, one audit INSERT and one INSERT per job of emails.
+        self.assertEqual(sorted(writes), ['INSERT'] * 3 + ['UPDATE'])
+
+        counts = dict(CVSubmission.objects.filter(unit=self.engineering).values_list('status').annotate(Count('pk')))
+        self.assertEqual(counts, {'approved': NOTIFY_BATCH_SIZE + 5, 'submitted': 3})
+        self.assertFalse(CVSubmission.objects.filter(unit=self.science, status='approved').exists())
+        change = StatusChange.objects.first()
+        self.assertEqual((change.from_status, change.to_status, change.changed_by), ('reviewed', 'approved', self.admin))
+        self.assertEqual(StatusChange.objects.count(), NOTIFY_BATCH_SIZE + 5)
+        self.assertEqual(dict(CVSubmission.objects.values_list('pk', 'updated_at')), updated)
+
+        self.assertEqual(Job.objects.count(), 2)
+        with LocalSMTPServer() as smtp, override_settings(**smtp.email_settings()):
+            self.assertEqual(run_pending(), 2)
+        self.assertEqual(len(smtp.messages), NOTIFY_BATCH_SIZE + 5)
+        self.assertIn('approved', smtp.messages[0][2].get_payload())
+
+    def test_transitions_are_enforced(self):
+        self.client.force_login(self.admin)
+        self.add_cvs(2, self.engineering, 'submitted')
+        response = self.act('mark_approved')
+        self.assertContains(response, 'No CVs marked as approved: only reviewed CVs can be.')
+        self.act('mark_reviewed')
+        self.act('mark_approved')
+        self.assertEqual(change_status(CVSubmission.objects.all(), 'reviewed'), 0)
+        self.assertEqual(change_status(CVSubmission.objects.all(), 'submitted'), 2)
+        self.assertEqual(
+            list(StatusChange.objects.order_by('pk').values_list('from_status', 'to_status')),
+            [('submitted', 'reviewed')] * 2 + [('reviewed', 'approved')] * 2 + [('approved', 'submitted')] * 2,
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_change_form_is_audited(self):
+        self.client.force_login(self.admin)
+        cv = CVSubmission.objects.create(name='Amina', tel_no='080', email='amina@abu.edu.ng', age_bracket='31-40')
+        self.client.post(f'/admin/cv/cvsubmission/{cv.pk}/change/', {
+            'name': 'Amina', 'tel_no': '080', 'email': 'amina@abu.edu.ng', 'age_bracket': '31-40', 'status': 'reviewed',
+        })
+        change = StatusChange.objects.get()
+        self.assertEqual((change.cv, change.from_status, change.to_status), (cv, 'submitted', 'reviewed'))
+
+    def test_change_form_enforces_transitions(self):
+        self.client.force_login(self.admin)
+        cv = CVSubmission.objects.create(name='Amina', tel_no='080', email='amina@abu.edu.ng', age_bracket='31-40')
+        url = f'/admin/cv/cvsubmission/{cv.pk}/change/'
+        self.assertEqual(
+            [value for value, _ in self.client.get(url).context['adminform'].form.fields['status'].choices],
+            ['submitted', 'reviewed'],
+        )
+        response = self.client.post(url, {
+            'name': 'Amina', 'tel_no': '080', 'email': 'amina@abu.edu.ng', 'age_bracket': '31-40', 'status': 'approved',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('status', response.context['adminform'].form.errors)
+        cv.refresh_from_db()
+        self.assertEqual(cv.status, 'submitted')
+        self.assertFalse(StatusChange.objects.exists())
@@ -6,4 +6,7 @@ urlpatterns = [
     path('verify-code/', views.verify_code, name='verify_code'),
     path('cv_submission/', views.cv_submission, name='cv_submission'),
     path('success/', views.success, name='success'),
+    path('experts/', views.expert_finder, name='expert_finder'),
+    path('cvs/<int:pk>/', views.cv_document, name='cv_document'),
+    path('cvs/<int:pk>/print/', views.cv_document_print, name='cv_document_print'),
 ]
\ No newline at end of file
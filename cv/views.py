@@ -1,15 +1,22 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import render, redirect
-from django.core.mail import send_mail
-from django.conf import settings
 from django.contrib import messages
-from django.forms import formset_factory
-from django.forms import inlineformset_factory
-from .models import CVSubmission, LanguageSkill, Grant, ComputerSkill, Education, ProfessionalMembership, ResearchArea, Training, ProfessionalProject, Award, Patent, OtherInstitution
-from .forms import EmailVerificationForm, CVSubmissionForm, GrantForm, LanguageSkillForm, ComputerSkillForm, EducationForm, ProfessionalMembershipForm, ResearchAreaForm, TrainingForm, ProfessionalProjectForm, AwardForm, PatentForm, OtherInstitutionForm
+from django.db import IntegrityError, transaction
+from .documents import get_document
+from .forms import EmailVerificationForm, CVSubmissionForm
+from .models import CVSubmission
+from .facets import facet_counts, filter_cvs, parse_selection
+from .formsets import CV_SECTIONS, build_formsets, empty_form_html
+from .refresh import batch_refresh, request_refresh
+from .tasks import send_verification_email
 
 
 import random
+import re
 import string
+import uuid
 
 def generate_verification_code():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
@@ -18,18 +25,17 @@ def email_verification(request):
     if request.method == 'POST':
         form = EmailVerificationForm(request.POST)
         if form.is_valid():
-            email = form.cleaned_data['email']
+            # Lowercased: resubmissions are matched on it.
+            email = form.cleaned_data['email'].lower()
             verification_code = generate_verification_code()
+            # A new address must be verified anew before any CV is shown.
+            request.session.pop('verified', None)
+            request.session.pop('verified_email', None)
             request.session['verification_email'] = email
             request.session['verification_code'] = verification_code
-            
-            send_mail(
-                'ABUCONS CV Submission Verification',
-                f'Your verification code is: {verification_code}',
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
+
+            # Sent by the run_jobs worker so the request never waits on SMTP.
+            send_verification_email.enqueue(email=email, code=verification_code)
             return redirect('verify_code')
     else:
         form = EmailVerificationForm()
@@ -41,8 +47,12 @@ def verify_code(request):
         user_code = request.POST.get('verification_code', '')
         saved_code = request.session.get('verification_code', '')
         
-        if user_code == saved_code:
+        if saved_code and user_code == saved_code:
+            # The address the code was sent to: the only one whose CV this
+            # session may load or update.
             request.session['verified'] = True
+            request.session['verified_email'] = request.session['verification_email']
+            del request.session['verification_code']
             return redirect('cv_submission')
         else:
             messages.error(request, "Invalid verification code. Please try again.")
@@ -53,80 +63,144 @@ def verify_code(request):
 
 
 
-def save_formset(formset, cv):
-    """Helper method to save formset data with CV relation"""
-    instances = formset.save(commit=False)
-    for instance in instances:
-        instance.cv = cv
-        instance.save()
-    for form in formset.deleted_objects:
-        form.delete()
+def save_formsets(formsets, cv):
+    """
+    Write every child formset of a CV with at most one bulk insert, one bulk
+    update and one batched delete per child model. Bound to stored rows, a
+    formset only yields the rows that changed, so unchanged rows cost nothing.
+    """
+    for formset in formsets.values():
+        formset.instance = cv
+        model = formset.model
+        instances = formset.save(commit=False)
+        new = [instance for instance in instances if instance._state.adding]
+        changed = [instance for instance in instances if not instance._state.adding]
+        if new:
+            model.objects.bulk_create(new)
+        if changed:
+            model.objects.bulk_update(changed, formset.form._meta.fields)
+        deleted = [obj.pk for obj in formset.deleted_objects if obj.pk is not None]
+        if deleted:
+            model.objects.filter(pk__in=deleted).delete()
+
+    # Bulk writes send no signals: refresh the CV's search document and facets.
+    request_refresh(cv.pk)
+
+
+def submission_token(request):
+    """The idempotency token a form was rendered with, if well formed."""
+    token = request.POST.get('submission_token', '')
+    return token if re.fullmatch(r'[0-9a-f]{32}', token) else ''
+
+
+def save_submission(cv_form, formsets, email, token):
+    """
+    Save a valid CV form and its formsets, unless the form with this token
+    was saved already. Returns whether it was saved.
+    """
+    existing = cv_form.instance if cv_form.instance.pk else None
+    with transaction.atomic(), batch_refresh():
+        if existing is not None:
+            # Locks the CV: a concurrent POST of the same form waits here,
+            # then finds its token applied.
+            applied = (
+                CVSubmission.objects.select_for_update().filter(pk=existing.pk)
+                .values_list('submission_token', flat=True).first()
+            )
+            if token and applied == token:
+                return False
+        cv = cv_form.save(commit=False)
+        cv.email = email
+        cv.submission_token = token
+        cv.save()
+        save_formsets(formsets, cv)
+    return True
+
 
 def cv_submission(request):
-    if not request.session.get('verified'):
+    email = request.session.get('verified_email')
+    if not (request.session.get('verified') and email):
         return redirect('email_verification')
 
-    # Define formset factory configurations with new names and ordering
-    formset_classes = {
-        'language': inlineformset_factory(CVSubmission, LanguageSkill, form=LanguageSkillForm, can_delete=True, extra=1),
-        'education': inlineformset_factory(CVSubmission, Education, form=EducationForm, can_delete=True, extra=1),
-        'training': inlineformset_factory(CVSubmission, Training, form=TrainingForm, can_delete=True, extra=1),
-        'computer': inlineformset_factory(CVSubmission, ComputerSkill, form=ComputerSkillForm, can_delete=True, extra=1),
-        'research': inlineformset_factory(CVSubmission, ResearchArea, form=ResearchAreaForm, can_delete=True, extra=1, max_num=10),
-        'patent': inlineformset_factory(CVSubmission, Patent, form=PatentForm, can_delete=True, extra=1),
-        'grant': inlineformset_factory(CVSubmission, Grant, form=GrantForm, can_delete=True, extra=1),
-        'award': inlineformset_factory(CVSubmission, Award, form=AwardForm, can_delete=True, extra=1),
-        'membership': inlineformset_factory(CVSubmission, ProfessionalMembership, form=ProfessionalMembershipForm, can_delete=True, extra=1),
-        'project': inlineformset_factory(CVSubmission, ProfessionalProject, form=ProfessionalProjectForm, can_delete=True, extra=1),
-        'institution': inlineformset_factory(CVSubmission, OtherInstitution, form=OtherInstitutionForm, can_delete=True, extra=1),
-    }
-
-    # Display names mapping
-    display_names = {
-        'language': 'Language Competency',
-        'education': 'Tertiary Education',
-        'training': 'Additional Qualifications/Trainings with Certificate',
-        'computer': 'ICT Skills',
-        'research': 'Core Research Areas',
-        'patent': 'Patents',
-        'grant': 'grants',
-        'award': 'Awards/Recognitions',
-        'membership': 'Professional Memberships',
-        'project': 'Professional Projects',
-        'institution': 'Other Institutions',
-    }
+    # A verified resubmission edits the person's CV (the newest, if there are
+    # several from before emails were matched) rather than adding one.
+    existing = CVSubmission.objects.filter(email=email).order_by('-pk').first()
 
     if request.method == 'POST':
-        cv_form = CVSubmissionForm(request.POST)
-        temp_cv = CVSubmission()  # Dummy instance to build inline formsets
-        formsets = {name: factory(request.POST, prefix=name, instance=temp_cv) for name, factory in formset_classes.items()}
+        token = submission_token(request)
+        if token and CVSubmission.objects.filter(submission_token=token).exists():
+            # A repeated POST of a form already saved.
+            return redirect('success')
+
+        cv_form = CVSubmissionForm(request.POST, instance=existing)
+        formsets = build_formsets(request.POST, instance=existing)
 
         all_valid = cv_form.is_valid() and all(fs.is_valid() for fs in formsets.values())
 
         if all_valid:
-            cv = cv_form.save(commit=False)
-            cv.email = request.session.get('verification_email')
-            cv.save()
-
-            for name, formset in formsets.items():
-                formset.instance = cv
-                save_formset(formset, cv)
-
-            messages.success(request, "CV submitted successfully!")
+            try:
+                saved = save_submission(cv_form, formsets, email, token)
+            except IntegrityError:
+                # Two POSTs of a first submission at once: the other one saved it.
+                if not (token and CVSubmission.objects.filter(submission_token=token).exists()):
+                    raise
+                saved = False
+            if saved:
+                messages.success(request, "CV updated successfully!" if existing else "CV submitted successfully!")
             return redirect('success')
+        token = token or uuid.uuid4().hex
     else:
-        cv_form = CVSubmissionForm()
-        dummy_cv = CVSubmission()
-        formsets = {name: factory(prefix=name, instance=dummy_cv) for name, factory in formset_classes.items()}
+        cv_form = CVSubmissionForm(instance=existing)
+        formsets = build_formsets(instance=existing)
+        token = uuid.uuid4().hex
 
     context = {
         'cv_form': cv_form,
-        'formsets': formsets,
-        'display_names': display_names,
-        'formset_order': ['language', 'education', 'training', 'computer', 'research', 'patent', 'grant', 'award', 'membership', 'project', 'institution'],
+        'sections': [(section, formsets[section.name], empty_form_html(section.name)) for section in CV_SECTIONS],
+        'submission_token': token,
+        'existing': existing,
     }
     return render(request, 'cv/cv_submission.html', context)
 
 
 def success(request):
-    return render(request, 'cv/success.html')
\ No newline at end of file
+    return render(request, 'cv/success.html')
+
+
+# CVs listed per expert-finder page.
+EXPERTS_PER_PAGE = 50
+
+
+@staff_member_required
+def expert_finder(request):
+    selection = parse_selection(request.GET)
+    # Newest first by primary key: no sort over the matching rows.
+    cvs = filter_cvs(selection).select_related('unit').order_by('-pk')
+    page = Paginator(cvs, EXPERTS_PER_PAGE).get_page(request.GET.get('page'))
+
+    query = request.GET.copy()
+    query.pop('page', None)
+    context = {
+        'facets': facet_counts(selection),
+        'page': page,
+        'query': query.urlencode(),
+        'title': 'Expert finder',
+    }
+    return render(request, 'cv/expert_finder.html', context)
+
+
+@staff_member_required
+def cv_document(request, pk):
+    # One row: the CV's pre-rendered document.
+    document = get_document(pk)
+    if document is None:
+        raise Http404('No such CV.')
+    return render(request, 'cv/cv_document.html', {'document': document, 'title': document.data['name']})
+
+
+@staff_member_required
+def cv_document_print(request, pk):
+    document = get_document(pk)
+    if document is None:
+        raise Http404('No such CV.')
+    return render(request, 'cv/cv_document_print.html', {'document': document})
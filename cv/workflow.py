@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CVSubmission, StatusChange
+from .tasks import send_status_emails
+
+
+# Audit rows per INSERT.
+AUDIT_BATCH_SIZE = 500
+
+# Notification emails sent per queued job, over one SMTP connection.
+NOTIFY_BATCH_SIZE = 100
+
+
+def change_status(queryset, status, user=None, notify=False):
+    """
+    Move the CVs of ``queryset`` whose status may go to ``status`` (see
+    CVSubmission.STATUS_TRANSITIONS) with one UPDATE; the others are left
+    alone. Their audit rows take one bulk insert and, with ``notify``, the
+    emails to them are queued in batches. Returns the number moved.
+
+    The rows are not saved one by one, so no signals are sent; their version
+    is bumped, so their reviewer documents are rebuilt when next read. Their
+    updated_at is left alone: StatusChange.changed_at records the move.
+    """
+    sources = CVSubmission.STATUS_TRANSITIONS[status]
+    now = timezone.now()
+    with transaction.atomic():
+        eligible = CVSubmission.objects.filter(pk__in=queryset.values('pk'), status__in=sources)
+        # Locked, so the UPDATE moves exactly the rows read for the audit.
+        moving = list(eligible.select_for_update().order_by('pk').values_list('pk', 'status', 'name', 'email'))
+        if not moving:
+            return 0
+        CVSubmission.objects.filter(
+            pk__in=[pk for pk, *_ in moving], status__in=sources,
+        ).update(status=status, version=F('version') + 1)
+        StatusChange.objects.bulk_create([
+            StatusChange(cv_id=pk, from_status=from_status, to_status=status, changed_by=user, changed_at=now)
+            for pk, from_status, *_ in moving
+        ], batch_size=AUDIT_BATCH_SIZE)
+        if notify:
+            recipients = [[name, email] for _, _, name, email in moving]
+            for start in range(0, len(recipients), NOTIFY_BATCH_SIZE):
+                send_status_emails.enqueue(status=status, recipients=recipients[start:start + NOTIFY_BATCH_SIZE])
+    return len(moving)
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import Job, DeadJob
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'status', 'attempts', 'run_after', 'created_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['attempts', 'last_error', 'created_at']
+
+
+@admin.register(DeadJob)
+class DeadJobAdmin(admin.ModelAdmin):
+    list_display = ['task', 'attempts', 'created_at', 'failed_at']
+    list_filter = ['task']
+    readonly_fields = ['task', 'payload', 'attempts', 'last_error', 'created_at', 'failed_at']
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected jobs')
+    def requeue(self, request, queryset):
+        Job.objects.bulk_create([Job(task=dead.task, payload=dead.payload) for dead in queryset])
+        count, _ = queryset.delete()
+        self.message_user(request, f'{count} job(s) requeued.')
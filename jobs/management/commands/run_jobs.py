@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due and exit.')
+        parser.add_argument('--batch', type=int, default=100, help='Jobs to run per poll.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_pending(limit=options['batch'])
+            if ran:
+                self.stdout.write(f'Ran {ran} job(s).')
+            if options['once']:
+                return
+            if not ran:
+                time.sleep(options['sleep'])
@@ -0,0 +1,90 @@
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, DeadJob
+
+
+_tasks = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def task(name):
+    """
+    Register a function as a queued task under a stable name:
+
+        @task('cv.send_verification_email')
+        def send_verification_email(email, code): ...
+
+        send_verification_email.enqueue(email=email, code=code)
+    """
+    def decorator(func):
+        _tasks[name] = func
+        func.enqueue = partial(enqueue, name)
+        return func
+    return decorator
+
+
+def enqueue(name, **payload):
+    if name not in _tasks:
+        raise KeyError(f"Unknown task {name!r}")
+    return Job.objects.create(task=name, payload=payload)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: JOBS_RETRY_DELAY seconds, doubling per attempt."""
+    delay = _setting('JOBS_RETRY_DELAY', 30) * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, _setting('JOBS_MAX_RETRY_DELAY', 3600)))
+
+
+def claim(job):
+    """Take the lease on a job. Returns False if another worker got it first."""
+    lease_until = timezone.now() + timedelta(seconds=_setting('JOBS_LEASE_SECONDS', 300))
+    claimed = Job.objects.filter(pk=job.pk, run_after=job.run_after).update(
+        status='running', attempts=F('attempts') + 1, run_after=lease_until,
+    )
+    if claimed:
+        job.refresh_from_db(fields=['status', 'attempts', 'run_after'])
+    return bool(claimed)
+
+
+def run_job(job):
+    """Run a claimed job; delete it on success, reschedule or bury it on failure."""
+    try:
+        func = _tasks[job.task]
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= _setting('JOBS_MAX_ATTEMPTS', 5):
+            with transaction.atomic():
+                DeadJob.objects.create(
+                    task=job.task, payload=job.payload, attempts=job.attempts,
+                    last_error=error, created_at=job.created_at,
+                )
+                job.delete()
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', last_error=error, run_after=timezone.now() + retry_delay(job.attempts),
+            )
+        return False
+
+    job.delete()
+    return True
+
+
+def run_pending(limit=100):
+    """Run up to ``limit`` due jobs. Returns the number of jobs run."""
+    ran = 0
+    for job in Job.objects.filter(run_after__lte=timezone.now())[:limit]:
+        if claim(job):
+            run_job(job)
+            ran += 1
+    return ran
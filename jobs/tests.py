@@ -0,0 +1,48 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job, DeadJob
+from jobs.queue import run_pending
+from jobs.testing import LocalSMTPServer
+
+
+class VerificationEmailQueueTests(TestCase):
+    def submit_email(self):
+        return self.client.post('/resource-persons/', {'email': 'someone@abu.edu.ng'})
+
+    def test_view_enqueues_instead_of_sending(self):
+        with LocalSMTPServer() as smtp, override_settings(**smtp.email_settings()):
+            response = self.submit_email()
+        self.assertRedirects(response, '/resource-persons/verify-code/')
+        self.assertEqual(smtp.messages, [])
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'cv.send_verification_email')
+        self.assertEqual(job.payload['email'], 'someone@abu.edu.ng')
+
+    def test_worker_sends_queued_email(self):
+        self.submit_email()
+        code = self.client.session['verification_code']
+        with LocalSMTPServer() as smtp, override_settings(**smtp.email_settings()):
+            self.assertEqual(run_pending(), 1)
+        self.assertFalse(Job.objects.exists())
+        (sender, recipients, message), = smtp.messages
+        self.assertEqual(recipients, ['someone@abu.edu.ng'])
+        self.assertIn(code, message.get_payload())
+
+    @override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=60)
+    def test_failures_back_off_then_dead_letter(self):
+        self.submit_email()
+        with LocalSMTPServer(failures=2) as smtp, override_settings(**smtp.email_settings()):
+            run_pending()
+            job = Job.objects.get()
+            self.assertEqual(job.attempts, 1)
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(run_pending(), 0)
+
+            Job.objects.update(run_after=timezone.now())
+            run_pending()
+        self.assertFalse(Job.objects.exists())
+        dead = DeadJob.objects.get()
+        self.assertEqual(dead.attempts, 2)
+        self.assertIn('451', dead.last_error)
+        self.assertEqual(smtp.messages, [])
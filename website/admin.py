@@ -1,14 +1,20 @@
 from django.contrib import admin
+from .changelist import ChangelistBudgetMixin
 from .models import GeneralInformation, Carousel, Event, Blog, Service, Picture, Paragraph, Staff, Gallery, Feature
 # Register your models here.
 
-admin.site.register(GeneralInformation)
-admin.site.register(Carousel)
-admin.site.register(Event)
-admin.site.register(Blog)
-admin.site.register(Service)
-admin.site.register(Picture)
-admin.site.register(Paragraph)
-admin.site.register(Staff)
-admin.site.register(Gallery)
-admin.site.register(Feature)
\ No newline at end of file
+
+class ContentAdmin(ChangelistBudgetMixin, admin.ModelAdmin):
+    pass
+
+
+admin.site.register(GeneralInformation, ContentAdmin)
+admin.site.register(Carousel, ContentAdmin)
+admin.site.register(Event, ContentAdmin)
+admin.site.register(Blog, ContentAdmin)
+admin.site.register(Service, ContentAdmin)
+admin.site.register(Picture, ContentAdmin)
+admin.site.register(Paragraph, ContentAdmin)
+admin.site.register(Staff, ContentAdmin)
+admin.site.register(Gallery, ContentAdmin)
+admin.site.register(Feature, ContentAdmin)
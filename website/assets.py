@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import get_template
+
+
+# The stylesheets and scripts of website/partials/base.html, in load order.
+BUNDLES = {
+    'site.css': [
+        'website/assets/bootstrap/css/bootstrap.min.css',
+        'website/assets/css/icofont.css',
+        'website/assets/css/fontawesome-all.min.css',
+        'website/assets/css/animate.css',
+        'website/assets/css/meanmenu.min.css',
+        'website/assets/owlcarousel/css/owl.carousel.min.css',
+        'website/assets/owlcarousel/css/owl.theme.default.min.css',
+        'website/assets/venobox/css/venobox.css',
+        'website/assets/css/style.css',
+        'website/assets/css/responsive.css',
+    ],
+    'site.js': [
+        'website/assets/js/jquery-2.2.4.min.js',
+        'website/assets/bootstrap/js/popper.min.js',
+        'website/assets/bootstrap/js/bootstrap.min.js',
+        'website/assets/js/jquery.meanmenu.min.js',
+        'website/assets/js/jquery.sticky.js',
+        'website/assets/owlcarousel/js/owl.carousel.min.js',
+        'website/assets/js/jquery.appear.js',
+        'website/assets/js/jquery.inview.min.js',
+        'website/assets/venobox/js/venobox.min.js',
+        'website/assets/js/masonry.pkgd.min.js',
+        'website/assets/js/scrolltopcontrol.js',
+        'website/assets/js/wow.min.js',
+        'website/assets/js/scripts.js',
+        'website/assets/js/canvasjs.min.js',
+        'website/assets/js/canvasjs.activeone.js',
+    ],
+}
+
+# Page templates that get their above-the-fold CSS inlined.
+CRITICAL_TEMPLATES = [
+    'website/index.html',
+    'website/about-us.html',
+    'website/blog.html',
+    'website/single-blog.html',
+    'website/gallery.html',
+    'website/contact.html',
+    'website/single-service.html',
+    'website/error.html',
+    'website/search.html',
+]
+
+BASE_TEMPLATE = 'website/partials/base.html'
+
+# Written by the build_assets command into the app's static directory, so
+# collectstatic picks the bundles up like any other asset.
+BUNDLE_DIR = 'website/bundles'
+OUTPUT_ROOT = os.path.join(os.path.dirname(__file__), 'static')
+MANIFEST_NAME = f'{BUNDLE_DIR}/manifest.json'
+
+
+def bundles_enabled():
+    return getattr(settings, 'ASSET_BUNDLES', not settings.DEBUG)
+
+
+@lru_cache(maxsize=None)
+def load_manifest():
+    path = finders.find(MANIFEST_NAME)
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def critical_css(template_name):
+    name = load_manifest().get('critical', {}).get(template_name)
+    path = name and finders.find(name)
+    if not path:
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+# Building
+
+URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+# Strings and url() values are matched first so minify_css() copies them
+# verbatim: whitespace, commas and semicolons inside them are content.
+VERBATIM = r'''"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|url\(\s*(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^)]*)\s*\)'''
+COMMENT_RE = re.compile(rf'({VERBATIM})|/\*.*?\*/', re.S)
+WHITESPACE_RE = re.compile(rf'({VERBATIM})|\s*(?:;\s*)+(}})\s*|\s*([{{}};,])\s*|(\s+)', re.S)
+
+
+def rewrite_css_urls(css, source, base_url):
+    """
+    Point the relative url() references of the static file ``source`` at
+    ``base_url`` + their static path, since the rules no longer live next to
+    the files they reference.
+    """
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return f'url("{base_url}{target}")'
+    return URL_RE.sub(replace, css)
+
+
+def minify_css(css):
+    css = COMMENT_RE.sub(lambda m: m.group(1) or '', css)
+
+    def replace(match):
+        verbatim, close, punctuation, space = match.groups()
+        return verbatim or close or punctuation or ' '
+    return WHITESPACE_RE.sub(replace, css).strip()
+
+
+def read_static(path):
+    found = finders.find(path)
+    if not found:
+        raise FileNotFoundError(path)
+    with open(found, encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def build_bundle(name):
+    sources = BUNDLES[name]
+    if name.endswith('.css'):
+        # Bundles are written to BUNDLE_DIR: make references relative to it.
+        prefix = posixpath.relpath('.', BUNDLE_DIR) + '/'
+        return minify_css('\n'.join(rewrite_css_urls(read_static(path), path, prefix) for path in sources))
+    # The scripts are concatenated as they are; most already ship minified.
+    return '\n;\n'.join(read_static(path) for path in sources)
+
+
+def write_output(name, content, output_root=OUTPUT_ROOT):
+    path = os.path.join(output_root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def fingerprinted(name, content):
+    root, ext = posixpath.splitext(name)
+    digest = hashlib.md5(content.encode()).hexdigest()[:12]
+    return f'{BUNDLE_DIR}/{root}.{digest}{ext}'
+
+
+# Critical CSS
+
+INCLUDE_RE = re.compile(r'{%\s*include\s+[\'"]([^\'"]+)[\'"]\s*%}')
+TEMPLATE_SYNTAX_RE = re.compile(r'{[{%#].*?[}%#]}', re.S)
+SELECTOR_TOKEN_RE = re.compile(r'([.#]?)(-?[_a-zA-Z][_a-zA-Z0-9-]*)')
+
+
+def template_source(name):
+    return get_template(name).template.source
+
+
+def above_the_fold_html(template_name):
+    """
+    The markup a page shows before scrolling: the base layout up to its
+    content block, then the page itself (includes expanded) up to the end of
+    its first section.
+    """
+    base = template_source(BASE_TEMPLATE)
+    base = base[:base.find('{% block content %}')]
+    page = INCLUDE_RE.sub(lambda m: template_source(m.group(1)), template_source(template_name))
+    end = page.find('</section>')
+    return base + (page[:end] if end != -1 else page)
+
+
+def used_selectors(html):
+    html = TEMPLATE_SYNTAX_RE.sub(' ', html)
+    tags = {tag.lower() for tag in re.findall(r'<([a-zA-Z][a-zA-Z0-9]*)', html)} | {'html', 'body'}
+    classes = {name for value in re.findall(r'class="([^"]*)"', html) for name in value.split()}
+    ids = set(re.findall(r'id="([^"]+)"', html))
+    return tags, classes, ids
+
+
+def selector_matches(selector, tags, classes, ids):
+    selector = re.sub(r'::?[a-zA-Z-]+(\([^)]*\))?', '', selector)
+    selector = re.sub(r'\[[^\]]*\]', '', selector)
+    for prefix, name in SELECTOR_TOKEN_RE.findall(selector):
+        if prefix == '.' and name not in classes:
+            return False
+        if prefix == '#' and name not in ids:
+            return False
+        if not prefix and name.lower() not in tags:
+            return False
+    return True
+
+
+def css_blocks(css):
+    """Yield the (prelude, body) of each top-level block of a stylesheet."""
+    i, n = 0, len(css)
+    while i < n:
+        start = css.find('{', i)
+        if start == -1:
+            return
+        prelude = css[i:start].rsplit(';', 1)[-1].strip()
+        depth, j = 1, start + 1
+        while j < n and depth:
+            depth += {'{': 1, '}': -1}.get(css[j], 0)
+            j += 1
+        yield prelude, css[start + 1:j - 1]
+        i = j
+
+
+def extract_critical_css(css, tags, classes, ids):
+    kept = []
+    for prelude, body in css_blocks(css):
+        if prelude.startswith('@media'):
+            inner = extract_critical_css(body, tags, classes, ids)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@font-face'):
+            kept.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            # Keyframes and friends are not needed for first paint.
+            continue
+        else:
+            selectors = [s for s in prelude.split(',') if selector_matches(s, tags, classes, ids)]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(kept)
+
+
+def build_critical_css(template_name, bundle_css):
+    return extract_critical_css(bundle_css, *used_selectors(above_the_fold_html(template_name)))
+
+
+def build_all(output_root=OUTPUT_ROOT):
+    """Write every bundle and critical stylesheet plus their manifest under ``output_root``."""
+    manifest = {'bundles': {}, 'critical': {}}
+    for name in BUNDLES:
+        content = build_bundle(name)
+        path = fingerprinted(name, content)
+        write_output(path, content, output_root)
+        manifest['bundles'][name] = path
+
+    # Inlined into the page, so its url()s must be absolute.
+    absolute_css = minify_css('\n'.join(
+        rewrite_css_urls(read_static(path), path, settings.STATIC_URL) for path in BUNDLES['site.css']
+    ))
+    for template_name in CRITICAL_TEMPLATES:
+        content = build_critical_css(template_name, absolute_css)
+        path = f'{BUNDLE_DIR}/critical/{template_name.replace("/", "-")}'.replace('.html', '.css')
+        write_output(path, content, output_root)
+        manifest['critical'][template_name] = path
+
+    write_output(MANIFEST_NAME, json.dumps(manifest, indent=2), output_root)
+    load_manifest.cache_clear()
+    critical_css.cache_clear()
+    return manifest
@@ -0,0 +1,230 @@
+import hashlib
+import uuid
+from dataclasses import dataclass, fields
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from website.models import GeneralInformation, Carousel, Picture, Service, Staff, Blog, Feature
+
+
+# Cache key prefix for the per-model version tokens. The tokens live in the
+# shared cache backend so every worker process sees the same ones.
+VERSION_KEY = 'website:version:%s'
+CHROME_KEY = 'website:chrome:%s'
+PAGE_KEY = 'website:page:%s'
+RECENT_POSTS_KEY = 'website:recent-posts:%s:%s'
+MODIFIED_KEY = 'website:modified:%s'
+FRAGMENT_KEY = 'website:fragment:%s:%s'
+
+# Models the header/footer/homepage "site chrome" is built from.
+CHROME_MODELS = (GeneralInformation, Carousel, Feature, Picture, Service, Staff, Blog)
+
+# Picture rows looked up by title for the page backgrounds.
+CHROME_PICTURES = ('md', 'cli', 'vid', 'footer', 'breadcumb')
+
+# How many posts the "latest/recent post" sidebars and footer list.
+RECENT_POSTS_LIMIT = 5
+
+
+def version_key(model):
+    return VERSION_KEY % model._meta.label_lower
+
+
+def _new_version():
+    # A fresh random token rather than an incremented counter: the file cache
+    # has no atomic incr across processes, so two concurrent bumps could land
+    # on the same number. Whichever token is stored last is one no entry was
+    # ever keyed on, including after an eviction.
+    return uuid.uuid4().hex[:16]
+
+
+def get_versions(models):
+    """Return the current version token of each model, in order."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        # add() is a no-op if another worker initialised the key meanwhile.
+        cache.add(key, _new_version(), timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_version(model):
+    """
+    Give ``model`` a new version. Call it once the change is committed (see
+    website.signals): a page built between the bump and the commit would be
+    stored under the new version from the old data.
+    """
+    cache.set(version_key(model), _new_version(), timeout=None)
+    cache.set(MODIFIED_KEY % model._meta.label_lower, timezone.now(), timeout=None)
+
+
+def get_last_modified(models):
+    """
+    Return when any of ``models`` last changed. Saves and deletes record the
+    time in the cache; the ``updated`` column is only read on a cold cache.
+    """
+    keys = {model: MODIFIED_KEY % model._meta.label_lower for model in models}
+    stamps = cache.get_many(keys.values())
+    for model, key in keys.items():
+        if key not in stamps:
+            stamps[key] = model.objects.aggregate(last=Max('updated'))['last']
+            cache.add(key, stamps[key], timeout=None)
+    return max((stamp for stamp in stamps.values() if stamp is not None), default=None)
+
+
+def get_recent_posts(limit=RECENT_POSTS_LIMIT):
+    """
+    The newest ``limit`` posts, with only the columns a post list shows
+    (never the content), cached until the next Blog change.
+    """
+    version, = get_versions([Blog])
+    key = RECENT_POSTS_KEY % (limit, version)
+    posts = cache.get(key)
+    if posts is None:
+        posts = tuple(Blog.objects.only('id', 'title', 'posted', 'image')[:limit])
+        cache.set(key, posts, timeout=None)
+    return posts
+
+
+@dataclass(frozen=True)
+class SiteChrome:
+    data: object
+    carousels: tuple
+    features: tuple
+    md: object
+    cli: object
+    services: tuple
+    staff: tuple
+    vid: object
+    recent_posts: tuple
+    footer: object
+    breadcumb: object
+
+
+CHROME_KEYS = tuple(field.name for field in fields(SiteChrome))
+
+
+def build_site_chrome():
+    pictures = {}
+    for picture in Picture.objects.filter(title__in=CHROME_PICTURES).order_by('id'):
+        pictures.setdefault(picture.title, picture)
+
+    return SiteChrome(
+        data=GeneralInformation.objects.first(),
+        carousels=tuple(Carousel.objects.all().order_by('id')),
+        features=tuple(Feature.objects.all().order_by('id')),
+        services=tuple(Service.objects.all().order_by('id')),
+        staff=tuple(Staff.objects.all()),
+        recent_posts=get_recent_posts(),
+        **{title: pictures.get(title) for title in CHROME_PICTURES},
+    )
+
+
+# Per-process copy of the last snapshot, so a warm worker does not even have
+# to unpickle it: only the version tokens are fetched from the cache.
+_local_chrome = (None, None)
+
+
+def get_site_chrome():
+    global _local_chrome
+    key = CHROME_KEY % '.'.join(str(v) for v in get_versions(CHROME_MODELS))
+    local_key, chrome = _local_chrome
+    if local_key == key:
+        return chrome
+
+    chrome = cache.get(key)
+    if chrome is None:
+        chrome = build_site_chrome()
+        cache.set(key, chrome, timeout=None)
+    _local_chrome = (key, chrome)
+    return chrome
+
+
+# Per-process copies of the last rendering of each fragment, by name.
+_local_fragments = {}
+
+
+def get_fragment(name, models, render):
+    """
+    Return the HTML of template fragment ``name``, rendered by ``render()``
+    only when one of the ``models`` it reads has changed since it was cached.
+    """
+    key = FRAGMENT_KEY % (name, '.'.join(str(v) for v in get_versions(models)))
+    local_key, html = _local_fragments.get(name, (None, None))
+    if local_key == key:
+        return html
+
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout=None)
+    _local_fragments[name] = (key, html)
+    return html
+
+
+def page_cache_key(request, models, query_params=()):
+    params = urlencode(sorted((name, request.GET[name]) for name in query_params if name in request.GET))
+    versions = '.'.join(str(v) for v in get_versions(models))
+    return hashlib.md5(f'{request.path}?{params}|{versions}'.encode()).hexdigest()
+
+
+def page_tags(models):
+    return tuple(dict.fromkeys(CHROME_MODELS + models))
+
+
+def cache_public_page(*models, query_params=(), uncached_params=()):
+    """
+    Cache the full response of a public page for anonymous GET requests.
+
+    The page is tagged with ``models`` (plus the site chrome models every page
+    renders) and the cache key includes the version of each tag, so saving a
+    model only misses the pages tagged with it. Only the GET parameters named
+    in ``query_params`` are part of the key; any others are ignored. Requests
+    carrying any of ``uncached_params``, whose values are free text, bypass
+    the cache so they can't crowd the real pages out of it.
+    """
+    tags = page_tags(models)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD') or request.user.is_authenticated
+                or any(name in request.GET for name in uncached_params)
+            ):
+                return view(request, *args, **kwargs)
+
+            key = PAGE_KEY % page_cache_key(request, tags, query_params)
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies and not response.streaming:
+                    cache.set(key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_public_page(*models, query_params=()):
+    """
+    Answer conditional GETs for a public page from the same tags as
+    cache_public_page, without calling the view: the ETag is derived from the
+    tag versions and Last-Modified from the tagged models' change times.
+    """
+    tags = page_tags(models)
+
+    def etag(request, *args, **kwargs):
+        return page_cache_key(request, tags, query_params)
+
+    def last_modified(request, *args, **kwargs):
+        return get_last_modified(tags)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
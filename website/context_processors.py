@@ -1,33 +1,28 @@
-from website.models import GeneralInformation, Carousel, Picture, Paragraph, Service, Staff, Blog, Feature
+from functools import partial
 
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 
+from website.cache import CHROME_KEYS, get_site_chrome
 
 
-def data_processor(request):
-    query = GeneralInformation.objects.all()[0]
-    carousel = Carousel.objects.all().order_by('id')
-    features = Feature.objects.all().order_by('id')
-    md = Picture.objects.filter(title="md").first()
-    cli = Picture.objects.filter(title="cli").first()
-    services = Service.objects.all().order_by('id')
-    staff = Staff.objects.all()
-    vid = Picture.objects.get(title="vid")
-    blogs = Blog.objects.all()
-    footer = Picture.objects.get(title="footer")
-    breadcumb = Picture.objects.get(title="breadcumb")
+def request_scopes(request):
+    """
+    The URL namespaces of the resolved view. Urlconfs included without a
+    namespace are identified by the app the view lives in ('website', 'cv').
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return set()
+    return set(match.namespaces) | {match.func.__module__.partition('.')[0]}
 
 
+def data_processor(request):
+    if not request_scopes(request) & set(settings.SITE_CHROME_NAMESPACES):
+        return {}
 
-    return {
-      'data': query,
-      'carousels': carousel, 
-      'features': features,
-      'md': md,
-      'cli': cli,
-      'services': services,
-      'staff': staff,
-      'vid': vid,
-      'blogs': blogs,
-      'footer': footer,
-      'breadcumb': breadcumb
-    }
\ No newline at end of file
+    # Every key is resolved on first use only, so templates that never touch
+    # the site chrome never load it. The snapshot itself is built once per
+    # content version and shared by all workers; see website.cache.
+    chrome = SimpleLazyObject(get_site_chrome)
+    return {key: SimpleLazyObject(partial(getattr, chrome, key)) for key in CHROME_KEYS}
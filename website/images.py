@@ -0,0 +1,138 @@
+import json
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import models
+from PIL import Image, ImageOps
+
+
+# Widths (in pixels) of the derivatives generated for every uploaded image.
+# Widths larger than the original are skipped.
+DERIVATIVE_WIDTHS = (160, 320, 640, 1024, 1600)
+
+# (extension, Pillow format, save options)
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+DERIVATIVE_DIR = 'derivatives'
+
+
+# Keyed on the original's full name, extension included: photo.jpg and
+# photo.png are different images.
+
+def derivative_name(name, width, extension):
+    return f'{DERIVATIVE_DIR}/{name}-{width}w.{extension}'
+
+
+def manifest_name(name):
+    return f'{DERIVATIVE_DIR}/{name}.json'
+
+
+def image_fields(model):
+    return [field for field in model._meta.get_fields() if isinstance(field, models.ImageField)]
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _save(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def generate_derivatives(fieldfile, force=False):
+    """
+    Write the width-bounded WebP and JPEG derivatives of an uploaded image,
+    plus a manifest listing them, next to the other media. Returns the
+    manifest, or None when the file is missing or not an image.
+    """
+    if not fieldfile:
+        return None
+    return generate_file_derivatives(fieldfile.storage, fieldfile.name, force=force)
+
+
+def generate_file_derivatives(storage, name, force=False):
+    """generate_derivatives() for the image ``name`` of ``storage``."""
+    if not force and storage.exists(manifest_name(name)):
+        return None
+
+    try:
+        with storage.open(name, 'rb') as source:
+            original = ImageOps.exif_transpose(Image.open(source))
+            original.load()
+    except (OSError, Image.DecompressionBombError):
+        # Missing or not an image Pillow can read: serve the original only.
+        return None
+
+    # Every bucket narrower than the original, plus the original width itself
+    # (capped at the widest bucket) so the best candidate is never upscaled.
+    widths = sorted({width for width in DERIVATIVE_WIDTHS if width < original.width} | {min(original.width, DERIVATIVE_WIDTHS[-1])})
+
+    manifest = {extension: [] for extension, _, _ in DERIVATIVE_FORMATS}
+    for width in widths:
+        resized = original.copy()
+        resized.thumbnail((width, original.height * width // original.width + 1), Image.LANCZOS)
+        for extension, image_format, options in DERIVATIVE_FORMATS:
+            if image_format == 'JPEG':
+                encoded = _flatten(resized)
+            else:
+                encoded = resized if resized.mode in ('RGB', 'RGBA') else resized.convert('RGBA')
+            buffer = BytesIO()
+            encoded.save(buffer, image_format, **options)
+            derivative = _save(storage, derivative_name(name, width, extension), buffer.getvalue())
+            manifest[extension].append((derivative, resized.width))
+
+    _save(storage, manifest_name(name), json.dumps(manifest).encode())
+    return manifest
+
+
+def generate_instance_derivatives(instance, force=False):
+    return [
+        generate_derivatives(getattr(instance, field.name), force=force)
+        for field in image_fields(type(instance))
+    ]
+
+
+def delete_derivatives(storage, name):
+    """Delete the derivatives of the image ``name`` and their manifest."""
+    manifest = _read_manifest(storage, manifest_name(name)) or {}
+    for derivative, _ in (candidate for candidates in manifest.values() for candidate in candidates):
+        storage.delete(derivative)
+    storage.delete(manifest_name(name))
+
+
+def _read_manifest(storage, name):
+    try:
+        with storage.open(name, 'rb') as manifest:
+            return json.loads(manifest.read())
+    except (OSError, ValueError):
+        return None
+
+
+# Per-process copies of the manifests read, by name: (modified time, manifest).
+_manifests = {}
+
+
+def load_manifest(fieldfile):
+    """The derivative manifest of an image, re-read only when its file changes."""
+    storage, name = fieldfile.storage, manifest_name(fieldfile.name)
+    try:
+        modified = storage.get_modified_time(name)
+    except (OSError, NotImplementedError):
+        return None
+    cached = _manifests.get(name)
+    if cached and cached[0] == modified:
+        return cached[1]
+    manifest = _read_manifest(storage, name)
+    _manifests[name] = (modified, manifest)
+    return manifest
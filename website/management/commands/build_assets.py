@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from website.assets import OUTPUT_ROOT, build_all
+
+
+class Command(BaseCommand):
+    help = 'Bundle the site CSS/JS into fingerprinted files and extract per-page critical CSS. Run before collectstatic.'
+
+    def handle(self, *args, **options):
+        manifest = build_all()
+        for name, path in manifest['bundles'].items():
+            self.stdout.write(f'{name}: {path}')
+        for template_name, path in manifest['critical'].items():
+            self.stdout.write(f'{template_name}: {path}')
+        self.stdout.write(self.style.SUCCESS(f'Wrote assets under {OUTPUT_ROOT}.'))
@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from website.cache import bump_version
+from website.images import generate_instance_derivatives, image_fields
+
+
+class Command(BaseCommand):
+    help = 'Generate the responsive WebP/JPEG derivatives of existing website images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that already exist.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in apps.get_app_config('website').get_models():
+            fields = [field.name for field in image_fields(model)]
+            if not fields:
+                continue
+            written = 0
+            for instance in model.objects.only('pk', *fields).iterator():
+                written += len([manifest for manifest in generate_instance_derivatives(instance, force=options['force']) if manifest])
+            if written:
+                # Cached pages still hold the plain <img> markup.
+                bump_version(model)
+            total += written
+            self.stdout.write(f'{model._meta.label}: done')
+        self.stdout.write(self.style.SUCCESS(f'Generated derivatives for {total} image(s).'))
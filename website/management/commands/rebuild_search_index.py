@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from website.search import rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of blogs, services, projects and events.'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('Full-text search needs the SQLite database backend (FTS5).')
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} row(s).'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0011_blog_updated_carousel_updated_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='blog',
+            options={'ordering': ('-posted', '-id')},
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['-posted', '-id'], name='website_blog_posted_id_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+# Kinds are numbered by position; must match website.search.SEARCH_MODELS.
+SEARCH_MODELS = ('Blog', 'Service', 'Project', 'Event')
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases simply get no search index.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS website_search USING fts5("
+            "title, content, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        for kind, name in enumerate(SEARCH_MODELS):
+            rows = [
+                (pk * len(SEARCH_MODELS) + kind, title, strip_tags(content))
+                for pk, title, content in apps.get_model('website', name).objects.values_list('pk', 'title', 'content')
+            ]
+            cursor.executemany('INSERT INTO website_search (rowid, title, content) VALUES (%s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS website_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0012_blog_posted_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
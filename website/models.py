@@ -16,6 +16,7 @@ class GeneralInformation(models.Model):
     address = models.CharField(max_length=500, null=True)
     file1 = models.FileField(upload_to='files', null=True, blank=True)
     file2 = models.FileField(upload_to='files', null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
 
 
 
@@ -30,6 +31,7 @@ class Carousel(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     button_text = models.CharField(max_length=100, null=True)
     button_link = models.TextField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -43,6 +45,7 @@ class Service(models.Model):
     content = models.TextField()
     image = models.ImageField(upload_to='pics', null=True, blank=True)
     icon = models.CharField(max_length=100, null=True)
+    updated = models.DateTimeField(auto_now=True)
 
 
     def __str__(self):
@@ -56,6 +59,7 @@ class Feature(models.Model):
     content = models.TextField()
     image = models.ImageField(upload_to='pics', null=True, blank=True)
     icon = models.CharField(max_length=200)
+    updated = models.DateTimeField(auto_now=True)
 
 
     def __str__(self):
@@ -71,6 +75,7 @@ class Event(models.Model):
     image = models.ImageField(upload_to='pics')
     time = models.DateTimeField()
     venue = models.TextField()
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -84,6 +89,7 @@ class Blog(models.Model):
     image = models.ImageField(upload_to='pics', null=True, blank=True)
     posted = models.DateTimeField(auto_now_add=True)
     news_file = models.FileField(upload_to='website files', null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
 
 
     def __str__(self):
@@ -91,13 +97,18 @@ class Blog(models.Model):
 
 
     class Meta:
-        ordering = ('-posted',)
+        ordering = ('-posted', '-id')
+        indexes = [
+            # Keyset pagination of the blog listing; see website.pagination.
+            models.Index(fields=['-posted', '-id'], name='website_blog_posted_id_idx'),
+        ]
 
 
 
 class Picture(models.Model):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='pics')
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -105,6 +116,7 @@ class Picture(models.Model):
 class Paragraph(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -120,6 +132,7 @@ class Staff(models.Model):
     designation = models.TextField()
     background = models.TextField(null=True, blank=True)
     image = models.ImageField(upload_to='pics', null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
     
 
     def __str__(self):
@@ -129,6 +142,7 @@ class Staff(models.Model):
 class Gallery(models.Model):
     image = models.ImageField(upload_to='pics')
     title = models.CharField(max_length=200, null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
@@ -139,6 +153,7 @@ class Project(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     image = models.ImageField(upload_to='pics', null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True)
 
 
 
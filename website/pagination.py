@@ -0,0 +1,97 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+# The largest OFFSET the database takes (a signed 64-bit integer); a page
+# number beyond it is past the end of any table.
+MAX_OFFSET = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj):
+    raw = f'{obj.posted.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        posted, pk = raw.split('|')
+        return datetime.fromisoformat(posted), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+class KeysetPage:
+    """
+    One page of a queryset ordered newest first on (posted, id), located by
+    the key of the row next to it rather than by an OFFSET, so every page
+    costs the same index range scan however deep it is.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self.has_previous else None
+
+
+def _older_than(key):
+    posted, pk = key
+    return Q(posted__lt=posted) | Q(posted=posted, pk__lt=pk)
+
+
+def _newer_than(key):
+    posted, pk = key
+    return Q(posted__gt=posted) | Q(posted=posted, pk__gt=pk)
+
+
+def keyset_page(queryset, per_page, after=None, before=None, page=None):
+    """
+    Return the ``per_page`` rows after the ``after`` cursor, before the
+    ``before`` cursor, or on numbered ``page`` (old ?page=N links).
+    """
+    newest_first = queryset.order_by('-posted', '-pk')
+    oldest_first = queryset.order_by('posted', 'pk')
+
+    if before is not None:
+        rows = list(oldest_first.filter(_newer_than(decode_cursor(before)))[:per_page + 1])
+        if len(rows) > per_page:
+            return KeysetPage(rows[:per_page][::-1], True, True)
+        # Walked back to the newest post: show the real first page.
+        after = page = None
+
+    if after is not None:
+        key = decode_cursor(after)
+    elif page is not None and page > 1:
+        # Map a page number onto the key of the last row of the page before
+        # it. The lookup only reads the (posted, id) index.
+        offset = (page - 1) * per_page
+        key = newest_first.values_list('posted', 'pk')[offset - 1:offset].first() if offset <= MAX_OFFSET else None
+        if key is None:
+            rows = list(oldest_first[:per_page + 1])
+            return KeysetPage(rows[:per_page][::-1], False, len(rows) > per_page)
+    else:
+        rows = list(newest_first[:per_page + 1])
+        return KeysetPage(rows[:per_page], len(rows) > per_page, False)
+
+    rows = list(newest_first.filter(_older_than(key))[:per_page + 1])
+    return KeysetPage(rows[:per_page], len(rows) > per_page, True)
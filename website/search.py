@@ -0,0 +1,164 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from website.models import Blog, Event, Project, Service
+
+
+# FTS5 table holding the title and text of every searchable row. Its rowid
+# encodes (kind, pk), see search_rowid(), so a row is found by primary key.
+SEARCH_TABLE = 'website_search'
+
+# Searchable models, in the order their kind is numbered. Append only: the
+# position is part of every indexed rowid.
+SEARCH_MODELS = (Blog, Service, Project, Event)
+
+# bm25() column weights: a match in the title counts ten times one in the text.
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+SNIPPET_TOKENS = 24
+
+# Control characters cannot occur in the indexed text, so they can safely mark
+# the matches until the snippet has been escaped.
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+SearchHit = namedtuple('SearchHit', 'kind object title snippet url')
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def search_rowid(instance):
+    return instance.pk * len(SEARCH_MODELS) + SEARCH_MODELS.index(type(instance))
+
+
+def _split_rowid(rowid):
+    pk, kind = divmod(rowid, len(SEARCH_MODELS))
+    return SEARCH_MODELS[kind], pk
+
+
+def _document(instance):
+    return instance.title, strip_tags(instance.content)
+
+
+def index_object(instance):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [search_rowid(instance)])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, title, content) VALUES (%s, %s, %s)',
+            [search_rowid(instance), *_document(instance)],
+        )
+
+
+def unindex_object(instance):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [search_rowid(instance)])
+
+
+def rebuild_index():
+    """Re-index every searchable row. Returns the number of rows indexed."""
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for model in SEARCH_MODELS:
+            rows = [
+                (search_rowid(instance), *_document(instance))
+                for instance in model.objects.only('pk', 'title', 'content').iterator()
+            ]
+            cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (rowid, title, content) VALUES (%s, %s, %s)', rows)
+            total += len(rows)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query matching documents that contain every
+    word, the last one as a prefix. Quoting each word keeps FTS5 operators
+    and syntax in the input from being interpreted.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _marked(text):
+    return mark_safe(escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def _url(instance):
+    if isinstance(instance, Blog):
+        return reverse('single-blog', args=[instance.pk])
+    if isinstance(instance, Service):
+        return reverse('single-service', args=[instance.pk])
+    # Projects and events have no page of their own yet.
+    return reverse('construction')
+
+
+class SearchResults:
+    """
+    The ranked matches of a query as a lazy sequence, so a Paginator only
+    fetches the count and the rows of the page it shows.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query) if search_available() else None
+
+    def count(self):
+        if self.expression is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [self.expression])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if self.expression is None:
+            return []
+        start, stop = index.start or 0, index.stop
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, '
+                f'highlight({SEARCH_TABLE}, 0, %s, %s), '
+                f'snippet({SEARCH_TABLE}, 1, %s, %s, %s, %s) '
+                f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                f'ORDER BY bm25({SEARCH_TABLE}, %s, %s) LIMIT %s OFFSET %s',
+                [_MARK_START, _MARK_END, _MARK_START, _MARK_END, '…', SNIPPET_TOKENS,
+                 self.expression, TITLE_WEIGHT, CONTENT_WEIGHT, stop - start, start],
+            )
+            rows = cursor.fetchall()
+
+        # One query per kind on the page for the objects themselves.
+        wanted = {}
+        for rowid, _, _ in rows:
+            model, pk = _split_rowid(rowid)
+            wanted.setdefault(model, []).append(pk)
+        objects = {
+            model: model.objects.defer('content').in_bulk(pks)
+            for model, pks in wanted.items()
+        }
+
+        hits = []
+        for rowid, title, snippet in rows:
+            model, pk = _split_rowid(rowid)
+            instance = objects[model].get(pk)
+            if instance is not None:
+                hits.append(SearchHit(model._meta.verbose_name, instance, _marked(title), _marked(snippet), _url(instance)))
+        return hits
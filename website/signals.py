@@ -0,0 +1,59 @@
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+
+from website.cache import bump_version
+from website.images import image_fields
+from website.search import SEARCH_MODELS, index_object, unindex_object
+from website.tasks import build_image_derivatives
+
+
+def bump_model_version(sender, **kwargs):
+    # After the commit, so no other worker caches the old rows under the new
+    # version; outside a transaction it runs at once.
+    transaction.on_commit(partial(bump_version, sender))
+
+
+def remember_images(sender, instance, **kwargs):
+    fields = [field.attname for field in image_fields(sender)]
+    stored = sender._base_manager.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+    instance._stored_images = stored or {}
+
+
+def queue_image_derivatives(sender, instance, **kwargs):
+    # Encoding every width is slow, so uploads hand it to the jobs queue; the
+    # page shows the plain image until the derivatives exist. The job commits
+    # with the row, so a worker never sees one without the other.
+    stored = getattr(instance, '_stored_images', {})
+    for field in image_fields(sender):
+        name = getattr(instance, field.attname).name or None
+        replaced = stored.get(field.attname) or None
+        if name != replaced:
+            build_image_derivatives.enqueue(model=sender._meta.label, field=field.name, image=name, replaced=replaced)
+
+
+def update_search_index(sender, instance, **kwargs):
+    index_object(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+def connect_signals():
+    # Every website model carries a version token; the chrome snapshot and
+    # the page cache key on the tokens of the models they depend on.
+    for model in apps.get_app_config('website').get_models():
+        label = model._meta.label_lower
+        if image_fields(model):
+            pre_save.connect(remember_images, sender=model, dispatch_uid=f'derivatives-pre-{label}')
+            post_save.connect(queue_image_derivatives, sender=model, dispatch_uid=f'derivatives-{label}')
+        post_save.connect(bump_model_version, sender=model, dispatch_uid=f'version-save-{label}')
+        post_delete.connect(bump_model_version, sender=model, dispatch_uid=f'version-delete-{label}')
+
+    for model in SEARCH_MODELS:
+        label = model._meta.label_lower
+        post_save.connect(update_search_index, sender=model, dispatch_uid=f'search-save-{label}')
+        post_delete.connect(remove_from_search_index, sender=model, dispatch_uid=f'search-delete-{label}')
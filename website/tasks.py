@@ -0,0 +1,22 @@
+from django.apps import apps
+
+from jobs.queue import task
+
+from .cache import bump_version
+from .images import delete_derivatives, generate_file_derivatives
+
+
+@task('website.build_image_derivatives')
+def build_image_derivatives(model, field, image, replaced=None):
+    """
+    Generate the derivatives of the ``image`` uploaded to ``field`` of
+    ``model``, deleting those of the ``replaced`` image, then re-version the
+    model so cached pages pick the <picture> markup up.
+    """
+    model = apps.get_model(model)
+    storage = model._meta.get_field(field).storage
+    if replaced:
+        delete_derivatives(storage, replaced)
+    if image:
+        generate_file_derivatives(storage, image, force=True)
+    bump_version(model)
@@ -0,0 +1,56 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from website.assets import BUNDLES, bundles_enabled, critical_css, load_manifest
+
+register = template.Library()
+
+
+def _page_critical_css(context):
+    if not bundles_enabled():
+        return None
+    return critical_css(context.template.origin.template_name)
+
+
+def _bundle_url(name):
+    path = load_manifest().get('bundles', {}).get(name) if bundles_enabled() else None
+    return path and static(path)
+
+
+@register.simple_tag(takes_context=True)
+def critical_styles(context):
+    """Inline the above-the-fold CSS of the page being rendered, if built."""
+    css = _page_critical_css(context)
+    if not css:
+        return ''
+    return format_html('<style>{}</style>', mark_safe(css.replace('</', '<\\/')))
+
+
+@register.simple_tag(takes_context=True)
+def stylesheets(context, name='site.css'):
+    """
+    Link the built ``name`` bundle, or each of its source files when bundles
+    are off (DEBUG) or not built. Pages with inlined critical CSS load the
+    bundle without blocking the first paint.
+    """
+    url = _bundle_url(name)
+    if not url:
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(path),) for path in BUNDLES[name]))
+    if _page_critical_css(context):
+        return format_html(
+            '<link rel="preload" href="{0}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            '<noscript><link rel="stylesheet" href="{0}"></noscript>',
+            url,
+        )
+    return format_html('<link rel="stylesheet" href="{}">', url)
+
+
+@register.simple_tag
+def scripts(name='site.js'):
+    """Load the built ``name`` bundle, or each of its source files."""
+    url = _bundle_url(name)
+    if not url:
+        return format_html_join('\n', '<script src="{}"></script>', ((static(path),) for path in BUNDLES[name]))
+    return format_html('<script src="{}"></script>', url)
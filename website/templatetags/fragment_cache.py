@@ -0,0 +1,43 @@
+from django import template
+from django.apps import apps
+
+from website.cache import get_fragment
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    # Nodes are shared between threads by the cached template loader: nothing
+    # here is mutated after parsing, all per-render state stays in locals.
+    def __init__(self, nodelist, name, models):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+
+    def render(self, context):
+        return get_fragment(self.name, self.models, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def versioned_cache(parser, token):
+    """
+    Cache the enclosed fragment until one of the named models changes:
+
+        {% versioned_cache 'footer' 'website.GeneralInformation' 'website.Blog' %}
+            ...
+        {% endversioned_cache %}
+
+    The fragment must only depend on those models, not on the request.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and at least one model label.")
+    labels = [bit.strip('\'"') for bit in bits[1:]]
+    try:
+        models = tuple(apps.get_model(label) for label in labels[1:])
+    except (LookupError, ValueError) as e:
+        raise template.TemplateSyntaxError(f"'{bits[0]}': {e}")
+
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    return VersionedCacheNode(nodelist, labels[0], models)
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.html import format_html
+
+from website.images import load_manifest
+
+register = template.Library()
+
+
+def _srcset(storage, candidates):
+    return ', '.join(f'{storage.url(name)} {width}w' for name, width in candidates)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', css_class='img-fluid'):
+    """
+    Render an ImageField as a <picture> with WebP and JPEG srcsets built
+    from the derivatives queued on upload, e.g.
+
+        {% responsive_image blog.image sizes="65px" %}
+
+    Images without derivatives (job not yet run, or not backfilled) fall back to a plain
+    <img> of the original.
+    """
+    if not image:
+        return ''
+
+    manifest = load_manifest(image)
+    if not manifest:
+        return format_html('<img class="{}" src="{}" alt="{}" loading="lazy">', css_class, image.url, alt)
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy">'
+        '</picture>',
+        _srcset(image.storage, manifest['webp']), sizes,
+        css_class, image.url, _srcset(image.storage, manifest['jpg']), sizes, alt,
+    )
@@ -1,3 +1,602 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from PIL import Image
+
+from jobs.models import Job
+from jobs.queue import run_pending
+
+from . import assets, cache as site_cache
+from .cache import CHROME_KEYS, RECENT_POSTS_LIMIT, get_recent_posts, get_versions
+from .context_processors import data_processor
+from .images import load_manifest, manifest_name
+from .models import Blog, Gallery, GeneralInformation, Picture, Project, Service
+from .pagination import keyset_page
+from .search import search_available
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def image_file(name='photo.png', color=(255, 0, 0), size=(8, 8)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, Image.registered_extensions()[os.path.splitext(name)[1]])
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class WebsiteTestCase(TestCase):
+    """Public pages over a throwaway media root and an empty in-memory cache."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Before super(), which runs setUpTestData.
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root, CACHES=LOCMEM_CACHES))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        GeneralInformation.objects.create(
+            phone_number='080', email='info@abucons.ng', preamble='ABUCONS', logo=image_file(), footer_logo=image_file(),
+            file1=SimpleUploadedFile('brochure.pdf', b'%PDF'),
+        )
+        for title in ('md', 'cli', 'vid', 'footer', 'breadcumb'):
+            Picture.objects.create(title=title, image=image_file())
+        cls.service = Service.objects.create(title='Surveying', content='Land surveys', icon='survey', image=image_file())
+        # The fixture images render plain; tests run the derivative jobs they queue.
+        Job.objects.all().delete()
+
+    def setUp(self):
+        cache.clear()
+
+    def save(self, model, **fields):
+        # The page versions move once the save is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(**fields)
+
+    def save_existing(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+
+class PageCacheTests(WebsiteTestCase):
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def test_anonymous_pages_are_served_from_the_cache(self):
+        self.save(Gallery, title='Dam site', image=image_file())
+        cold, cold_queries = self.get('/gallery/')
+        warm, warm_queries = self.get('/gallery/')
+        self.assertContains(warm, 'Dam site')
+        self.assertGreater(cold_queries, 0)
+        self.assertEqual(warm_queries, 0)
+
+        self.save(Gallery, title='Bridge site', image=image_file())
+        response, queries = self.get('/gallery/')
+        self.assertContains(response, 'Bridge site')
+        self.assertGreater(queries, 0)
+
+    def test_key_ignores_unlisted_parameters(self):
+        for i in range(3):
+            self.save(Blog, title=f'Post {i}', content='News', image=image_file())
+        self.get('/blog/?page=2')
+        response, queries = self.get('/blog/?page=2&utm_source=mail')
+        self.assertContains(response, 'Post 0')
+        self.assertEqual(queries, 0)
+        response, queries = self.get('/blog/')
+        self.assertContains(response, 'Post 2')
+        self.assertGreater(queries, 0)
+
+    def test_search_queries_are_not_cached(self):
+        self.save(Blog, title='Dam inspection', content='News')
+        self.get('/search/')
+        _, queries = self.get('/search/')
+        self.assertEqual(queries, 0)
+        for _ in range(2):
+            response, queries = self.get('/search/?search=dam')
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(queries, 0)
+
+    def test_other_models_keep_their_pages(self):
+        self.get('/gallery/')
+        self.save(Blog, title='Post', content='News', image=image_file())
+        _, queries = self.get('/gallery/')
+        self.assertGreater(queries, 0)  # Blog is in every page's chrome.
+        self.save(Project, title='Dam', content='Survey')
+        _, queries = self.get('/gallery/')
+        self.assertEqual(queries, 0)
+
+    def test_conditional_get(self):
+        blog = self.save(Blog, title='Post', content='News', image=image_file())
+        for url in ('/', '/gallery/', '/blog/?page=2', f'/blog/{blog.pk}/', f'/service/{self.service.pk}/'):
+            response, _ = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            not_modified, queries = self.get(url, if_none_match=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304, url)
+            self.assertEqual(queries, 0)
+            not_modified, _ = self.get(url, if_modified_since=response['Last-Modified'])
+            self.assertEqual(not_modified.status_code, 304, url)
+
+        etag = self.get('/gallery/')[0]['ETag']
+        self.save(Gallery, title='Dam site', image=image_file())
+        self.assertEqual(self.get('/gallery/', if_none_match=etag)[0].status_code, 200)
+
+
+class FragmentCacheTests(WebsiteTestCase):
+    def setUp(self):
+        super().setUp()
+        site_cache._local_fragments.clear()
+
+    def get(self):
+        """The gallery page, and the cache key each chrome fragment was served under."""
+        response = self.client.get('/gallery/')
+        self.assertEqual(response.status_code, 200)
+        return response, {name: key for name, (key, _) in site_cache._local_fragments.items()}
+
+    def update(self, obj, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+
+    def assertRerendered(self, change, *names):
+        """Make ``change`` and check exactly the fragments ``names`` are rendered anew."""
+        _, before = self.get()
+        change()
+        response, after = self.get()
+        self.assertEqual({name for name in before if after[name] != before[name]}, set(names))
+        return response
+
+    def test_footer_follows_its_models(self):
+        response = self.assertRerendered(
+            lambda: self.save(Blog, title='Dam inspection', content='News', image=image_file()), 'footer',
+        )
+        self.assertContains(response, 'Dam inspection')
+        self.assertRerendered(lambda: self.save(Picture, title='cli', image=image_file()), 'footer')
+
+    def test_header_follows_services(self):
+        response = self.assertRerendered(lambda: self.update(self.service, title='Geotechnics'), 'header')
+        self.assertContains(response, 'Geotechnics')
+
+    def test_general_information_renders_both(self):
+        info = GeneralInformation.objects.get()
+        response = self.assertRerendered(
+            lambda: self.update(info, email='desk@abucons.ng', preamble='Consultancy services'), 'header', 'footer',
+        )
+        self.assertContains(response, 'desk@abucons.ng')
+        self.assertContains(response, 'Consultancy services')
+
+    def test_other_models_keep_both(self):
+        response = self.assertRerendered(lambda: self.save(Gallery, title='Dam site', image=image_file()))
+        self.assertContains(response, 'Dam site')
+
+
+class SiteChromeScopeTests(WebsiteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Drop this process's copy, so building the chrome has to query.
+        site_cache._local_chrome = (None, None)
+
+    def assertNoWebsiteQueries(self, url, expected):
+        with self.assertNumQueries(expected) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if '"website_' in query['sql']])
+
+    def test_cv_and_admin_pages_load_no_chrome(self):
+        self.assertNoWebsiteQueries('/resource-persons/', 0)
+        self.assertNoWebsiteQueries('/resource-persons/verify-code/', 0)
+        session = self.client.session
+        session.update({'verified': True, 'verification_email': 'amina@abu.edu.ng', 'verified_email': 'amina@abu.edu.ng'})
+        session.save()
+        # Session, the CV of the verified address, and the unit choices.
+        self.assertNoWebsiteQueries('/resource-persons/cv_submission/', 3)
+        self.client.force_login(User.objects.create_superuser('reviewer', 'reviewer@abu.edu.ng', 'secret'))
+        # Session, user and the recent actions.
+        self.assertNoWebsiteQueries('/admin/', 3)
+
+    def test_chrome_is_built_on_first_use(self):
+        request = RequestFactory().get('/gallery/')
+        request.resolver_match = resolve('/gallery/')
+        with self.assertNumQueries(0):
+            context = data_processor(request)
+            html = Template('{{ request.path }}').render(RequestContext(request, {'request': request}))
+        self.assertEqual(set(context), set(CHROME_KEYS))
+        self.assertEqual(html, '/gallery/')
+
+        with CaptureQueriesContext(connection) as queries:
+            html = Template('{{ data.email }}').render(RequestContext(request))
+        self.assertEqual(html, 'info@abucons.ng')
+        self.assertGreater(len(queries), 0)
+
+
+class RecentPostsTests(WebsiteTestCase):
+    def titles(self, posts):
+        return [post.title for post in posts]
+
+    def test_bounded_projection_is_cached(self):
+        for i in range(RECENT_POSTS_LIMIT + 2):
+            self.save(Blog, title=f'Post {i}', content='News')
+        with CaptureQueriesContext(connection) as queries:
+            posts = get_recent_posts()
+        newest = [f'Post {i}' for i in range(RECENT_POSTS_LIMIT + 1, 1, -1)]
+        self.assertEqual(self.titles(posts), newest)
+        sql, = [query['sql'] for query in queries if 'website_blog' in query['sql']]
+        self.assertIn(f'LIMIT {RECENT_POSTS_LIMIT}', sql)
+        self.assertNotIn('"content"', sql)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(get_recent_posts()), newest)
+
+    def test_saves_and_deletes_invalidate(self):
+        first = self.save(Blog, title='Post 0', content='News')
+        self.assertEqual(self.titles(get_recent_posts()), ['Post 0'])
+        self.save(Blog, title='Post 1', content='News')
+        self.assertEqual(self.titles(get_recent_posts()), ['Post 1', 'Post 0'])
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.titles(get_recent_posts()), ['Post 1'])
+
+    def test_home_shows_every_post_unless_limited(self):
+        for i in range(4):
+            self.save(Blog, title=f'Home post {i}', content='News')
+        # The news section's headings; the footer lists recent posts too.
+        self.assertContains(self.client.get('/'), '<h5>Home post 0</h5>')
+        cache.clear()
+        with self.settings(HOME_POSTS=1):
+            response = self.client.get('/')
+        self.assertContains(response, '<h5>Home post 3</h5>')
+        self.assertNotContains(response, '<h5>Home post 2</h5>')
+
+
+@override_settings(DEBUG=False)
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        source, root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, root)
+        os.makedirs(os.path.join(source, 'site'))
+        with open(os.path.join(source, 'site', 'app.css'), 'w') as f:
+            f.write('body { color: #123456; }\n' * 100)
+        # A manifest of just this file, built as in a deploy.
+        static_settings = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        static_settings.enable()
+        self.addCleanup(static_settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_names_are_immutable(self):
+        url = staticfiles_storage.url('site/app.css')
+        self.assertRegex(url, r'^/static/site/app\.[0-9a-f]{12}\.css$')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'max-age=31536000, public, immutable')
+
+        response = self.client.get(url, headers={'accept-encoding': 'br, gzip'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_unhashed_names_are_not(self):
+        response = self.client.get('/static/site/app.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+
+class VersionTests(WebsiteTestCase):
+    def test_versions_move_on_commit(self):
+        before, = get_versions([Gallery])
+        with self.captureOnCommitCallbacks() as callbacks:
+            Gallery.objects.create(title='Dam site', image=image_file())
+            self.assertEqual(get_versions([Gallery]), [before])
+        for callback in callbacks:
+            callback()
+        after, = get_versions([Gallery])
+        self.assertNotEqual(after, before)
+        self.assertEqual(get_versions([Blog, Gallery])[1], after)
+
+
+class ImageDerivativeTests(WebsiteTestCase):
+    def test_derivatives_are_generated_by_a_job(self):
+        blog = self.save(Blog, title='Post', content='News', image=image_file('wide.png', size=(2000, 100)))
+        self.assertIsNone(load_manifest(blog.image))
+        self.assertNotContains(self.client.get('/blog/'), '<picture>')
+
+        self.assertEqual(run_pending(), 1)
+        manifest = load_manifest(blog.image)
+        self.assertEqual([width for _, width in manifest['webp']], [160, 320, 640, 1024, 1600])
+        # The job re-versions the model, so the cached page is rebuilt.
+        self.assertContains(self.client.get('/blog/'), '<picture>')
+
+    def test_only_a_new_image_is_queued(self):
+        blog = self.save(Blog, title='Post', content='News', image=image_file())
+        run_pending()
+        blog.title = 'Renamed'
+        self.save_existing(blog)
+        self.assertFalse(Job.objects.exists())
+
+    def test_replaced_image_loses_its_derivatives(self):
+        gallery = self.save(Gallery, image=image_file('old.png', size=(400, 10)))
+        run_pending()
+        storage, old_name = gallery.image.storage, gallery.image.name
+        old_files = [name for name, _ in load_manifest(gallery.image)['webp']]
+
+        gallery.image = image_file('new.png', size=(400, 10))
+        self.save_existing(gallery)
+        run_pending()
+        self.assertFalse(any(storage.exists(name) for name in old_files))
+        self.assertFalse(storage.exists(manifest_name(old_name)))
+        self.assertIsNotNone(load_manifest(gallery.image))
+
+    def test_same_name_with_another_extension(self):
+        red = self.save(Gallery, image=image_file('scan.jpg', (255, 0, 0), (400, 10)))
+        blue = self.save(Gallery, image=image_file('scan.png', (0, 0, 255), (400, 10)))
+        run_pending()
+        (red_name, _), *_ = load_manifest(red.image)['jpg']
+        (blue_name, _), *_ = load_manifest(blue.image)['jpg']
+        self.assertNotEqual(red_name, blue_name)
+        with blue.image.storage.open(blue_name, 'rb') as derivative:
+            self.assertGreater(Image.open(derivative).convert('RGB').getpixel((0, 0))[2], 200)
+
+    def test_manifest_is_reread_only_when_it_changes(self):
+        gallery = self.save(Gallery, image=image_file(size=(400, 10)))
+        run_pending()
+        storage, name = gallery.image.storage, manifest_name(gallery.image.name)
+        self.assertIs(load_manifest(gallery.image), load_manifest(gallery.image))
+
+        path = storage.path(name)
+        with open(path, 'w') as manifest:
+            json.dump({'webp': [], 'jpg': []}, manifest)
+        modified = os.stat(path).st_mtime + 10
+        os.utime(path, (modified, modified))
+        self.assertEqual(load_manifest(gallery.image), {'webp': [], 'jpg': []})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            Blog.objects.create(title=f'Post {i}', content='News')
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, page):
+        return [blog.title for blog in page]
+
+    def test_walk_forward_and_back(self):
+        queryset = Blog.objects.all()
+        page = keyset_page(queryset, 2)
+        pages = [self.titles(page)]
+        while page.has_next:
+            page = keyset_page(queryset, 2, after=page.next_cursor)
+            pages.append(self.titles(page))
+        self.assertEqual(pages, [['Post 6', 'Post 5'], ['Post 4', 'Post 3'], ['Post 2', 'Post 1'], ['Post 0']])
+
+        back = []
+        while page.has_previous:
+            page = keyset_page(queryset, 2, before=page.previous_cursor)
+            back.append(self.titles(page))
+        self.assertEqual(back, pages[-2::-1])
+        self.assertFalse(page.has_previous)
+
+    def test_numbered_pages(self):
+        queryset = Blog.objects.all()
+        self.assertEqual(self.titles(keyset_page(queryset, 2, page=3)), ['Post 2', 'Post 1'])
+        self.assertEqual(self.titles(keyset_page(queryset, 2, page=4)), ['Post 0'])
+        # Past the end: the last page.
+        self.assertEqual(self.titles(keyset_page(queryset, 2, page=9)), ['Post 1', 'Post 0'])
+        self.assertEqual(self.titles(keyset_page(queryset, 2, page=10 ** 20)), ['Post 1', 'Post 0'])
+        response = self.client.get('/blog/', {'page': '99999999999999999999'})
+        self.assertEqual(self.titles(response.context['blogs']), ['Post 1', 'Post 0'])
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        response = self.client.get('/blog/', {'after': 'not-a-cursor'})
+        self.assertEqual(self.titles(response.context['blogs']), ['Post 6', 'Post 5'])
+
+
+class MediaTests(TestCase):
+    BODY = bytes(range(256)) * 1000
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'files'))
+        with open(os.path.join(media_root, 'files', 'doc.pdf'), 'wb') as f:
+            f.write(self.BODY)
+        media_settings = override_settings(MEDIA_ROOT=media_root, MEDIA_OFFLOAD=None)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def get(self, path='/media/files/doc.pdf', **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.BODY)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age', response['Cache-Control'])
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_ranges(self):
+        response = self.get(range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.BODY)}')
+        self.assertEqual(b''.join(response.streaming_content), self.BODY[10:20])
+
+        response = self.get(range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.BODY[-5:])
+
+        response = self.get(range='bytes=999999-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.BODY)}')
+
+        # Not a range at all: ignored.
+        response = self.get(range='bytes=5-3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.BODY)
+
+    def test_empty_file(self):
+        with open(os.path.join(settings.MEDIA_ROOT, 'files', 'empty.txt'), 'wb'):
+            pass
+        response = self.get('/media/files/empty.txt', range='bytes=-5')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+        self.assertEqual(self.get('/media/files/empty.txt').status_code, 200)
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(range='bytes=0-1', if_range=etag).status_code, 206)
+        self.assertEqual(self.get(range='bytes=0-1', if_range='"stale"').status_code, 200)
+
+    def test_refused(self):
+        self.assertEqual(self.get('/media/../DjangoApp/settings.py').status_code, 404)
+        self.assertEqual(self.get('/media/files/').status_code, 404)
+        self.assertEqual(self.client.post('/media/files/doc.pdf').status_code, 405)
+
+    def test_offload(self):
+        with self.settings(MEDIA_OFFLOAD='x-accel-redirect'):
+            response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/files/doc.pdf')
+        self.assertNotIn('Content-Type', response)
+        self.assertEqual(response.content, b'')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchTests(TestCase):
+    def setUp(self):
+        if not search_available():
+            self.skipTest('Full-text search needs SQLite FTS5.')
+        cache.clear()
+        self.dam = Blog.objects.create(title='Dam inspection', content='<p>Kaduna river survey</p>')
+        self.survey = Service.objects.create(title='Surveying', content='Includes a dam study', icon='survey')
+
+    def search(self, query):
+        response = self.client.get('/search/', {'search': query})
+        return [hit.object for hit in response.context['results']]
+
+    def test_ranked_prefix_search(self):
+        # A title match outranks a match in the text; the last word is a prefix.
+        self.assertEqual(self.search('dam'), [self.dam, self.survey])
+        self.assertEqual(self.search('kadu'), [self.dam])
+        self.assertEqual(self.search('river dam'), [self.dam])
+
+    def test_index_follows_changes(self):
+        self.dam.title = 'Bridge inspection'
+        self.dam.save()
+        self.assertEqual(self.search('bridge'), [self.dam])
+        self.dam.delete()
+        self.assertEqual(self.search('kaduna'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('dam OR "'), [])
+        self.assertEqual(self.search('(dam*) -'), [self.dam, self.survey])
+        self.assertEqual(self.search('***'), [])
+
+    def test_snippet_is_escaped(self):
+        response = self.client.get('/search/', {'search': 'kaduna'})
+        hit, = response.context['results']
+        self.assertIn('<mark>Kaduna</mark>', hit.snippet)
+        self.assertNotIn('<p>', hit.snippet)
+
+
+FIXTURE_CSS = """
+/* Theme */
+.breadcrumb { color : red ; }
+.footer-widget , #page-banner { content: "a , b" ; font-family: "Open Sans", serif; }
+@media (max-width: 600px) { .breadcrumb-item { margin: 0 } .recTitle { margin: 0 } }
+@keyframes spin { to { transform: rotate(1turn) } }
+.logo { background: url(../img/logo.png) }
+"""
+
+
+class AssetBundleTests(WebsiteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Fixture sources shadow the real ones; the build is written next to them.
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        for name, sources in assets.BUNDLES.items():
+            for path in sources:
+                content = FIXTURE_CSS if path.endswith('style.css') else f'/* {path} */' if name.endswith('.css') else 'var a = 1 ;'
+                os.makedirs(os.path.dirname(os.path.join(self.static_root, path)), exist_ok=True)
+                with open(os.path.join(self.static_root, path), 'w') as f:
+                    f.write(content)
+        static_settings = override_settings(
+            STATICFILES_DIRS=[self.static_root], STATIC_URL='/static/',
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+        )
+        static_settings.enable()
+        self.addCleanup(static_settings.disable)
+        self.addCleanup(assets.critical_css.cache_clear)
+        self.addCleanup(assets.load_manifest.cache_clear)
+
+    def read(self, path):
+        with open(os.path.join(self.static_root, path)) as f:
+            return f.read()
+
+    def test_minify_keeps_strings_and_urls(self):
+        self.assertEqual(
+            assets.minify_css('a , b { content: "a , b" ; background: url(data:image/png;base64,A B) ; }'),
+            'a,b{content: "a , b";background: url(data:image/png;base64,A B)}',
+        )
+
+    def test_build(self):
+        manifest = assets.build_all(self.static_root)
+        self.assertEqual(manifest, json.loads(self.read(assets.MANIFEST_NAME)))
+        self.assertEqual(set(manifest['critical']), set(assets.CRITICAL_TEMPLATES))
+
+        css_path = manifest['bundles']['site.css']
+        self.assertRegex(css_path, r'^website/bundles/site\.[0-9a-f]{12}\.css$')
+        css = self.read(css_path)
+        self.assertIn('.breadcrumb{color : red}', css)
+        self.assertIn('content: "a , b";font-family: "Open Sans",serif', css)
+        self.assertIn('url("../../website/assets/img/logo.png")', css)
+        self.assertNotIn('Theme', css)
+        js = self.read(manifest['bundles']['site.js'])
+        self.assertEqual(js.count('var a = 1 ;'), len(assets.BUNDLES['site.js']))
+
+    def test_critical_css_has_the_selectors_used_above_the_fold(self):
+        manifest = assets.build_all(self.static_root)
+        critical = self.read(manifest['critical']['website/error.html'])
+        self.assertEqual(
+            critical,
+            '.breadcrumb{color : red}#page-banner{content: "a , b";font-family: "Open Sans",serif}'
+            '@media (max-width: 600px){.breadcrumb-item{margin: 0}}'
+            '.logo{background: url("/static/website/assets/img/logo.png")}',
+        )
+
+    def test_tags(self):
+        assets.build_all(self.static_root)
+        with self.settings(ASSET_BUNDLES=False):
+            response = self.client.get('/construction/')
+        self.assertNotContains(response, '<style>')
+        self.assertContains(response, '<link rel="stylesheet" href="/static/website/assets/css/style.css">', html=True)
+        self.assertContains(response, '<script src="/static/website/assets/js/scripts.js">', html=True)
+
+        with self.settings(ASSET_BUNDLES=True):
+            response = self.client.get('/construction/')
+        html = response.content.decode()
+        self.assertIn('<style>.breadcrumb{color : red}', html)
+        self.assertRegex(html, r'<link rel="preload" href="/static/website/bundles/site\.[0-9a-f]{12}\.css" as="style"')
+        self.assertRegex(html, r'<script src="/static/website/bundles/site\.[0-9a-f]{12}\.js">')
+        self.assertNotIn('website/assets/css/style.css', html)
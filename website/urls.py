@@ -10,4 +10,5 @@ urlpatterns = [
     path('blog/<int:pk>/', views.single_blog, name='single-blog'),
     path('contact/', views.contact, name='contact'),
     path('service/<int:pk>/', views.single_service, name='single-service'),
+    path('search/', views.search, name='search'),
 ]
@@ -1,16 +1,33 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.http import HttpResponse
 from .models import *
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from .cache import cache_public_page, conditional_public_page, get_recent_posts
+from .pagination import InvalidCursor, keyset_page
+from .search import SEARCH_MODELS, SearchResults
 
+# Results per search page.
+SEARCH_PAGE_SIZE = 10
+
+@conditional_public_page()
+@cache_public_page()
 def home(request):
-    return render(request, 'website/index.html')
+    blogs = Blog.objects.all()
+    if settings.HOME_POSTS is not None:
+        blogs = blogs[:settings.HOME_POSTS]
+    context = {
+        'blogs': blogs,
+    }
+    return render(request, 'website/index.html', context)
 
 def construction(request):
     return render(request, 'website/error.html')
 
+@conditional_public_page(Gallery)
+@cache_public_page(Gallery)
 def gallery(request):
     gallerys = Gallery.objects.all()
     context = {
@@ -19,22 +36,25 @@ def gallery(request):
     return render(request, 'website/gallery.html', context)
 
 
+@cache_public_page()
 def about(request):
     return render(request, 'website/about-us.html')
 
 
+@conditional_public_page(Blog, query_params=('page', 'after', 'before'))
+@cache_public_page(Blog, query_params=('page', 'after', 'before'))
 def blog(request):
     blog_list = Blog.objects.all()
-    blogss = blog_list
-    page = request.GET.get('page', 1)
+    blogss = get_recent_posts()
 
-    paginator = Paginator(blog_list, 2)  # Show 5 blogs per page
     try:
-        blogs = paginator.page(page)
-    except PageNotAnInteger:
-        blogs = paginator.page(1)
-    except EmptyPage:
-        blogs = paginator.page(paginator.num_pages)
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    try:
+        blogs = keyset_page(blog_list, 2, after=request.GET.get('after'), before=request.GET.get('before'), page=page)
+    except InvalidCursor:
+        blogs = keyset_page(blog_list, 2)
 
     context = {
         'blogs': blogs,
@@ -43,9 +63,11 @@ def blog(request):
     return render(request, 'website/blog.html', context)
 
 
+@conditional_public_page(Blog)
+@cache_public_page(Blog)
 def single_blog(request, pk):
     blog = Blog.objects.get(id=pk)
-    blogs = Blog.objects.all()
+    blogs = get_recent_posts()
     context = {
         'blog': blog,
         'blogs': blogs
@@ -56,10 +78,13 @@ def single_blog(request, pk):
 def events(request):
     pass
 
+@cache_public_page()
 def contact(request):
     return render(request, 'website/contact.html')
 
 
+@conditional_public_page(Service)
+@cache_public_page(Service)
 def single_service(request, pk):
     service = Service.objects.get(id=pk)
     services = Service.objects.all()
@@ -72,6 +97,16 @@ def single_service(request, pk):
     return render(request, 'website/single-service.html', context)
 
 
+@conditional_public_page(*SEARCH_MODELS, query_params=('search', 'page'))
+@cache_public_page(*SEARCH_MODELS, query_params=('page',), uncached_params=('search',))
+def search(request):
+    query = request.GET.get('search', '').strip()
+    paginator = Paginator(SearchResults(query), SEARCH_PAGE_SIZE)
+    results = paginator.get_page(request.GET.get('page'))
 
-
-
+    context = {
+        'query': query,
+        'results': results,
+        'blogss': get_recent_posts(),
+    }
+    return render(request, 'website/search.html', context)